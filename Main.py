@@ -14,6 +14,26 @@ except ImportError as e:
     st.error(f"CRITICAL ERROR: UI Modules Missing. Please check your 'ui/' folder. Details: {e}")
     st.stop()
 
+@st.cache_resource
+def warm_up_models():
+    """Runs once per server process: loads the Ollama models before the first request needs them."""
+    try:
+        from modules import llm_gateway
+    except ImportError as e:
+        print(f"[-] LLM gateway unavailable, skipping model preload: {e}")
+        return None
+    return llm_gateway.preload_all()
+
+@st.cache_resource
+def start_housekeeping():
+    """Runs once per server process: expires bulk export archives left on disk, now and periodically."""
+    try:
+        from modules.forensic.bulk_export import start_export_janitor
+    except ImportError as e:
+        print(f"[-] Bulk export unavailable, skipping archive cleanup: {e}")
+        return None
+    return start_export_janitor()
+
 def main():
     # --- SIDEBAR SETUP ---
     st.sidebar.title("🧬 EvoForensic")
@@ -32,6 +52,24 @@ def main():
     )
     
     st.sidebar.markdown("---")
+
+    warm_up_models()
+    start_housekeeping()
+
+    # --- LLM GATEWAY HEALTH ---
+    with st.sidebar.expander("📶 LLM Gateway"):
+        try:
+            from modules import llm_gateway
+            metrics = llm_gateway.get_metrics()
+            if not metrics:
+                st.caption("No model requests yet.")
+            for model, stats in metrics.items():
+                st.caption(
+                    f"**{model}** · in-flight {stats['in_flight']} · queued {stats['queued']} "
+                    f"(peak {stats['max_queued']}) · {stats['requests']} reqs · {stats['errors']} errors"
+                )
+        except ImportError as e:
+            st.caption(f"Gateway unavailable: {e}")
    
     # --- ROUTING LOGIC ---
     if "Dashboard" in mode:
@@ -1,4 +1,4 @@
-import ollama
+from modules import llm_gateway
 
 # Defined globally so it can be reused
 SYSTEM_INSTRUCTION = (
@@ -33,8 +33,8 @@ def chat(message, history):
     # Construct message history with system prompt
     messages = [{"role": "system", "content": SYSTEM_INSTRUCTION}] + history + [{"role": "user", "content": message}]
     
-    # Call Ollama with stream=True
-    response_generator = ollama.chat(model="llama3.2", messages=messages, stream=True)
+    # Call Ollama with stream=True through the shared gateway
+    response_generator = llm_gateway.chat(model="llama3.2", messages=messages, stream=True)
 
     full_response = ""
     # Explicit loop to handle chunks and yield accumulated text
@@ -1,19 +1,27 @@
 # ============================================================
 # RESEARCH MODE (Logic Core)
-# Uses LangChain + Chroma (In-Memory) + Ollama
+# Uses LangChain + Chroma (persistent corpora) + Ollama (via the shared LLM gateway)
 # ============================================================
 
+import io
 import time
-import re
-from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_ollama import ChatOllama, OllamaEmbeddings
+import textwrap
+from itertools import zip_longest
+from modules import llm_gateway
+from modules.research import corpus_store, case_chunker, context_packer, answer_cache
+from modules.research.embedding_cache import CachedEmbeddings
+from modules.research.retrieval import hybrid_search, is_identifier_query
+from modules.research.case_index import route_query
 
 # Initialize Models
-# increased context window for better answers
-llm = ChatOllama(model="llama3.2", temperature=0.3) 
-embeddings = OllamaEmbeddings(model="mxbai-embed-large")
+LLM_MODEL = "llama3.2"
+LLM_OPTIONS = {"temperature": 0.3}
+EMBED_MODEL = "mxbai-embed-large"
+# Every embedding call goes through the shared content-addressed cache first
+embeddings = CachedEmbeddings(llm_gateway.GatewayEmbeddings(model=EMBED_MODEL), EMBED_MODEL)
+
+TOP_K = 7
+MAX_DIRECT_CHUNKS = 12  # Case lookups up to this size are sent whole, in document order
 
 SYSTEM_PROMPT = """
 You are a Forensic Research Assistant.
@@ -26,75 +34,125 @@ RULES:
 4. If the context is empty or irrelevant, say "Insufficient Evidence in the provided file."
 """
 
-def build_vectordb(text: str):
+def build_vectordb(source, session_id=None, on_progress=None):
     """
-    Reads a file and builds a temporary in-memory Vector DB with Metadata.
+    Reads a document and returns (num_chunks, corpus) for it.
+    source is either the text itself or a binary file object (e.g. a Streamlit
+    upload); file objects are hashed and ingested as streams and never decoded
+    into one string. (A Streamlit upload is itself already held in memory.)
+    Corpora are persisted under data/research_corpora/, keyed by the document's
+    content hash, the embedding model and the chunking parameters, so a file
+    that was indexed before is attached to instantly instead of re-embedded.
+    With a session_id the corpus is registered for that session (see get_session_corpus).
+    on_progress(chunks_embedded) is called as batches are inserted.
     """
-    # 1. Pre-Split by Case to ensure Case boundaries are respected
-    # This regex splits the text whenever it sees "⭐ CASE FILE" but keeps the delimiter.
-    case_blocks = re.split(r'(?=⭐\s*CASE FILE)', text)
-    
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000, 
-        chunk_overlap=200
-    )
-    
-    docs = []
-    global_chunk_index = 0
-    
-    for block in case_blocks:
-        if not block.strip():
-            continue
-            
-        # 2. Extract Case Number for Metadata
-        # Matches "CASE FILE 18" or "CASE FILE 2" ignoring case
-        match = re.search(r"CASE FILE\s+(\d+)", block, re.IGNORECASE)
-        case_num = match.group(1) if match else "general"
-        
-        # 3. Sub-chunk this specific case block
-        chunks = splitter.split_text(block)
-        
-        for c in chunks:
-            # Store case number explicitly in metadata
-            meta = {
-                "chunk": global_chunk_index,
-                "case_number": case_num
-            }
-            # We also prepend the Case ID to the content to help semantic search
-            wrapped = f"CASE {case_num} EVIDENCE:\n{c}"
-            
-            docs.append(Document(page_content=wrapped, metadata=meta))
-            global_chunk_index += 1
-    
-    # Create Ephemeral Chroma Instance
-    vectordb = Chroma.from_documents(
-        docs,
-        embedding=embeddings,
-        collection_name="temp_forensic_db"
-    )
-    return len(docs), vectordb
+    if isinstance(source, str):
+        doc_hash, num_bytes = corpus_store.content_hash(source), len(source.encode("utf-8"))
+    else:
+        # First streaming pass: hash only
+        doc_hash, num_bytes = corpus_store.content_hash_stream(source)
 
-def rag_answer(message, history, vectordb):
+    key = corpus_store.corpus_key(doc_hash, EMBED_MODEL, case_chunker.CHUNK_PARAMS)
+    start = time.perf_counter()
+    # A second upload of the same new file waits for the first build, then attaches to it
+    with corpus_store.build_lock(key):
+        # A corpus another session holds open is shared rather than opened twice
+        corpus = corpus_store.get_registry().lookup(key) or corpus_store.open_corpus(key, embeddings)
+        if corpus is not None:
+            corpus_store.touch_corpus(key)
+            print(f"[+] Attached to existing corpus {key} in {(time.perf_counter() - start) * 1000:.0f} ms.")
+        else:
+            corpus = _ingest(key, source, num_bytes, on_progress)
+            corpus_store.prune_stored_corpora(keep=corpus_store.get_registry().active_keys() | {key})
+
+        if session_id is not None:
+            corpus = corpus_store.get_registry().attach(session_id, corpus)
+    return corpus.num_chunks, corpus
+
+def get_session_corpus(session_id):
+    """Corpus loaded by this session, or None if it has none or it was evicted while idle."""
+    return corpus_store.get_registry().get(session_id)
+
+def release_session(session_id):
+    corpus_store.get_registry().detach(session_id)
+
+def _ingest(key, source, num_bytes, on_progress=None):
     """
-    Generator that streams the answer chunk-by-chunk.
-    Uses Metadata Filtering if a specific case is requested.
+    Streams the document through chunking, embedding and insertion into a new corpus.
+    Chunks are section-aligned, non-overlapping and carry Case ID / Type / Company / Year metadata.
     """
-    # 1. Analyze User Query for Case Number
-    # Looks for "case 18", "case file 18", "case #18"
-    target_case = None
-    case_query_match = re.search(r"case\s*(?:file|id|#)?\s*(\d+)", message, re.IGNORECASE)
-    
-    search_kwargs = {"k": 7}
-    
-    if case_query_match:
-        target_case = case_query_match.group(1)
-        # 2. Apply Strict Metadata Filter
-        # This tells Chroma: "Only give me chunks where case_number == target_case"
-        search_kwargs["filter"] = {"case_number": target_case}
+    if isinstance(source, str):
+        stream = io.StringIO(source)
+    else:
+        # Second pass: decode incrementally (multi-byte characters may straddle reads)
+        stream = io.TextIOWrapper(source, encoding="utf-8", errors="replace", newline="")
+    try:
+        # Embed once into a persistent corpus
+        return corpus_store.create_corpus(
+            key, case_chunker.iter_chunks(stream), embeddings,
+            info={"embedding_model": EMBED_MODEL, "num_bytes": num_bytes},
+            on_progress=on_progress,
+        )
+    finally:
+        if isinstance(stream, io.TextIOWrapper):
+            stream.detach()  # Leave the caller's file object open
+
+def rag_answer(message, history, corpus, stats=None):
+    """
+    Generator that streams the answer chunk-by-chunk from the session's corpus.
+    Case-specific questions are answered from the case index: every chunk of
+    the named case(s) in document order, with no embedding call. Everything
+    else uses hybrid BM25 + vector retrieval so exact identifiers are found.
+    Evidence and history are packed into a token budget; if a `stats` dict is
+    passed it is filled with the packing figures and the prompt token count.
+    Answers are cached per corpus: a repeated or near-duplicate question is
+    replayed from the cache, streamed the same way with its original sources.
+    Follow-ups that lean on the history only match within the same conversation.
+    """
+    # 1. Analyze User Query for the case(s) it names (number, Case ID or company)
+    target_cases = route_query(message, corpus.lexical)
+    target_case = target_cases[0] if target_cases else None
+    chunk_ids = [c for case in target_cases for c in corpus.lexical.case_chunks(case)]
+    whole_case = bool(target_cases) and len(chunk_ids) <= MAX_DIRECT_CHUNKS
+
+    # Recent history is packed first: follow-ups that lean on it are cached per conversation.
+    # Answer cache: the same question, or one phrased differently about the same cases and identifiers
+    history_text = context_packer.pack_history(history)
+    signature = answer_cache.query_signature(
+        message, target_cases, answer_cache.conversation_key(message, target_cases, history_text))
+    query_vector = None
+    cached = corpus.answers.lookup_exact(LLM_MODEL, message, signature)
+    # Whole-case and identifier lookups never embed the question, so neither does their cache lookup
+    if cached is None and not whole_case and not is_identifier_query(message):
+        query_vector = embeddings.embed_query(message)  # Reused from the embedding cache by retrieval
+        cached = corpus.answers.lookup_similar(LLM_MODEL, query_vector, signature)
+    if cached is not None:
+        print(f"[+] rag_answer served from cache (matched \"{cached['query']}\").")
+        if stats is not None:
+            stats.update({"answer_cache": "similar" if "similarity" in cached else "exact",
+                          "cached_query": cached["query"], "similarity": cached.get("similarity", 1.0),
+                          "citations": cached["citations"]})
+        yield from answer_cache.replay(cached["answer"])
+        yield answer_cache.format_sources(cached["citations"])
+        return
     
-    # 3. Retrieve
-    retriever = vectordb.as_retriever(search_kwargs=search_kwargs)
-    docs = retriever.invoke(message)
+    # 2. Retrieve
+    if target_cases:
+        if whole_case:
+            docs = corpus.lexical.get_documents(chunk_ids)
+        else:
+            # Too large to send whole: search within each named case (never the whole corpus),
+            # sharing TOP_K between them; results are interleaved so each case's best come first
+            per_case = -(-TOP_K // len(target_cases))
+            results = [hybrid_search(corpus, message, k=per_case, case_number=case) for case in target_cases]
+            docs = {}
+            for tier in zip_longest(*results):
+                for doc in filter(None, tier):
+                    docs.setdefault(doc.metadata["chunk"], doc)
+            docs = list(docs.values())
+    else:
+        # Lexical and dense results fused by reciprocal rank
+        docs = hybrid_search(corpus, message, k=TOP_K)
     
     if not docs:
         if target_case:
@@ -103,34 +161,46 @@ def rag_answer(message, history, vectordb):
             yield "⚠️ No relevant evidence found in the document."
         return
 
-    # Combine retrieved docs into context
-    context = "\n----------------\n".join([d.page_content for d in docs])
-    
-    # Construct Prompt
-    # We limit history to last 3 turns to prevent context overflow
-    recent_history = history[-3:] 
-    history_text = "\n".join([f"{role.upper()}: {msg}" for role, msg in recent_history])
+    # Pack evidence into the token budget (overlap and repeats removed)
+    context, pack_stats = context_packer.pack_context(docs, message, preserve_order=whole_case)
     
-    user_prompt = f"""
+    user_prompt = textwrap.dedent("""
     RETRIEVED CASE EVIDENCE:
     {context}
     
     CHAT HISTORY:
-    {history_text}
+    {history}
     
     INVESTIGATOR QUESTION:
     {message}
     
     TASK: Analyze the 'RETRIEVED CASE EVIDENCE' above to answer the question. 
     If the case is found, provide a summary including the Case ID, Type, and Verdict.
-    """
+    """).format(context=context, history=history_text, message=message)
+    
+    pack_stats["prompt_tokens_est"] = context_packer.estimate_tokens(SYSTEM_PROMPT + user_prompt)
+    print(f"[*] rag_answer prompt: ~{pack_stats['prompt_tokens_est']} tokens "
+          f"({pack_stats['passages']} passages from {pack_stats['retrieved_chunks']} chunks).")
+    citations = answer_cache.cite(docs, pack_stats["cited_chunks"])
+    if stats is not None:
+        stats.update(pack_stats, answer_cache="miss", citations=citations)
     
     # Stream Response
-    stream = llm.stream([
+    stream = llm_gateway.chat(LLM_MODEL, [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": user_prompt}
-    ])
+    ], stream=True, options=LLM_OPTIONS)
     
-    # Yield content directly
+    # Yield content directly; the final chunk carries Ollama's exact prompt token count
+    parts = []
     for chunk in stream:
-        yield chunk.content
\ No newline at end of file
+        if stats is not None and chunk.get("prompt_eval_count"):
+            stats["prompt_tokens"] = chunk["prompt_eval_count"]
+        parts.append(chunk["message"]["content"])
+        yield chunk["message"]["content"]
+    yield answer_cache.format_sources(citations)
+
+    # Only complete answers reach the cache (an interrupted stream never gets here)
+    answer = "".join(parts)
+    if answer.strip():
+        corpus.answers.store(LLM_MODEL, message, signature, answer, citations, query_vector)
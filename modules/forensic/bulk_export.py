@@ -0,0 +1,171 @@
+import os
+import re
+import time
+import secrets
+import datetime
+import threading
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from modules.forensic.report_generator import ForensicReport, _build_report, shared_report_fonts
+from modules.forensic.rag_engine import get_suspect_metadata
+
+# =====================================================================
+# CONFIGURATION & PATHS
+# =====================================================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SUSPECTS_DIR = os.path.join(BASE_DIR, "data", "suspects")
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+MAX_EXPORT_WORKERS = max(1, min(8, (os.cpu_count() or 2) - 1))
+MAX_PENDING_PER_WORKER = 2  # Bounds how many finished PDFs can sit in memory before being zipped
+
+# Archives are built on disk (outside the public static route) and handed to the requesting
+# session's download button; anything left behind by a crashed run expires.
+EXPORTS_DIR = os.path.join(BASE_DIR, "outputs", "exports")
+EXPORT_TTL_SECONDS = 15 * 60
+
+_janitor = None
+_janitor_lock = threading.Lock()
+
+# =====================================================================
+# WORKER PROCESS
+# =====================================================================
+def _init_worker(generated_at):
+    """
+    Runs once per worker process: pins the footer timestamp shared by the whole
+    batch and builds the report's font objects, which every document rendered
+    by this process then registers instead of creating its own.
+    """
+    ForensicReport.generated_at = generated_at
+    shared_report_fonts()
+
+def _render_job(job):
+    index, meta, match_score, image_path = job
+    pdf_bytes = bytes(_build_report(meta, match_score, image_path).output())
+    safe_name = re.sub(r"[^\w-]", "_", meta.get("full_name", "Suspect"))
+    return index, f"{index + 1:03d}_{safe_name}_Report.pdf", pdf_bytes
+
+# =====================================================================
+# PUBLIC API
+# =====================================================================
+def find_suspect_image(suspect_id):
+    """Reference photo for a suspect from the biometric enrolment folder, if any."""
+    for ext in IMAGE_EXTENSIONS:
+        path = os.path.join(SUSPECTS_DIR, f"{suspect_id.lower()}{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+def export_reports_zip(jobs, output, max_workers=MAX_EXPORT_WORKERS, on_progress=None):
+    """
+    Renders many ForensicReport PDFs in a process pool and streams them into one ZIP.
+    jobs: iterable of (meta, match_score, image_path); match_score may be None.
+    output: a path or a writable binary file object.
+    Only a bounded window of jobs is in flight, and each PDF is written to the
+    archive (and released) as soon as it finishes, so memory stays flat no
+    matter how many suspects are exported.
+    on_progress(completed) counts every finished job, including failed renders.
+    Returns the number of reports written.
+    """
+    generated_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    max_pending = max_workers * MAX_PENDING_PER_WORKER
+    job_iter = iter(jobs)
+    written = 0
+    completed = 0
+
+    # Spawned, not forked: a fork would copy the whole Streamlit server into every worker
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive, \
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                initializer=_init_worker, initargs=(generated_at,)) as pool:
+        pending = set()
+        index = 0
+        exhausted = False
+
+        while pending or not exhausted:
+            # Top up the in-flight window
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    meta, match_score, image_path = next(job_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(pool.submit(_render_job, (index, meta, match_score, image_path)))
+                index += 1
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                completed += 1
+                try:
+                    _, filename, pdf_bytes = future.result()
+                    archive.writestr(filename, pdf_bytes)
+                    written += 1
+                except Exception as e:
+                    print(f"[-] Failed to render a report in bulk export: {e}")
+                if on_progress:
+                    on_progress(completed)
+
+    print(f"[+] Bulk export complete: {written} reports archived.")
+    return written
+
+def export_suspects_zip(suspect_ids, output, max_workers=MAX_EXPORT_WORKERS, on_progress=None):
+    """
+    Bulk dossier export by suspect id, using the enrolled reference photos.
+    on_progress(completed) counts suspects, skipped ones included, so it ends at len(suspect_ids).
+    """
+    skipped = 0
+
+    def jobs():
+        nonlocal skipped
+        for suspect_id in suspect_ids:
+            try:
+                meta = get_suspect_metadata(suspect_id)
+            except Exception as e:
+                print(f"[-] Skipping {suspect_id}: {e}")
+                skipped += 1
+                continue
+            yield meta, None, find_suspect_image(suspect_id)
+
+    written = export_reports_zip(
+        jobs(), output, max_workers=max_workers,
+        on_progress=(lambda completed: on_progress(completed + skipped)) if on_progress else None,
+    )
+    if on_progress:
+        on_progress(len(suspect_ids))
+    return written
+
+def prune_export_archives():
+    """Removes archives older than EXPORT_TTL_SECONDS from EXPORTS_DIR."""
+    if not os.path.isdir(EXPORTS_DIR):
+        return
+    now = time.time()
+    for name in os.listdir(EXPORTS_DIR):
+        path = os.path.join(EXPORTS_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > EXPORT_TTL_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass  # Removed by a concurrent export
+
+def start_export_janitor(interval=EXPORT_TTL_SECONDS // 3):
+    """Prunes expired archives now and then every `interval` seconds on a daemon thread (once per process)."""
+    global _janitor
+
+    def run():
+        while True:
+            prune_export_archives()
+            time.sleep(interval)
+
+    with _janitor_lock:
+        if _janitor is None:
+            _janitor = threading.Thread(target=run, name="export-janitor", daemon=True)
+            _janitor.start()
+
+def new_export_archive():
+    """Path for a new archive under EXPORTS_DIR; expired archives are removed first."""
+    os.makedirs(EXPORTS_DIR, exist_ok=True)
+    prune_export_archives()
+    return os.path.join(EXPORTS_DIR, f"{secrets.token_urlsafe(16)}.zip")
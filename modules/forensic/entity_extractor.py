@@ -0,0 +1,149 @@
+import re
+
+# =====================================================================
+# DETERMINISTIC ENTITY PATTERNS
+# =====================================================================
+# Compiled once at import time so every dossier scan is a handful of
+# regex passes instead of a full LLM generation.
+IPV4_RE = re.compile(r"\b(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)\b")
+HASH_RE = re.compile(r"\b(?:[a-fA-F0-9]{64}|[a-fA-F0-9]{40}|[a-fA-F0-9]{32})\b")
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+# May open with "+" or "(" and end a sentence ("... 43210."), but not run into a longer dotted number
+PHONE_RE = re.compile(r"(?<![\w.])[+(]?\d[\d\s().-]{6,}\d(?!\w|\.\d)")
+FILE_RE = re.compile(
+    r"(?<![\w@])[\w\-]+\.(?:exe|dll|bat|ps1|sh|py|js|vbs|docm|docx|doc|xlsm|xlsx|xls|pdf|zip|rar|7z|"
+    r"enc|csv|txt|log|db|sql|bak|iso|img|apk|jar|key|pem)\b",
+    re.IGNORECASE,
+)
+QUOTED_ALIAS_RE = re.compile(r"""(?:alias|aka|a\.k\.a\.|known as|codename|handle)\s+['"‘“]([^'"’”]{2,40})['"’”]""", re.IGNORECASE)
+ORG_SUFFIX_RE = re.compile(
+    r"\b((?:[A-Z][\w&-]*\s+){0,4}[A-Z][\w&-]*\s+"
+    r"(?:Pvt\.?\s+Ltd\.?|Ltd\.?|Inc\.?|Corp\.?|Corporation|LLC|GmbH|Bank|Solutions|Technologies|Systems|Group|Holdings))\b"
+)
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Known organizations / crews seen across cases. Matched case-insensitively
+# as whole phrases; extend this list as new intelligence comes in.
+KNOWN_ORGANIZATIONS = [
+    "Lazarus Group",
+    "Shadow-Net",
+    "Interpol",
+    "Europol",
+    "CERT-In",
+    "FBI",
+    "NCA",
+]
+_GAZETTEER_RE = re.compile(
+    r"\b(" + "|".join(re.escape(org) for org in KNOWN_ORGANIZATIONS) + r")\b",
+    re.IGNORECASE,
+)
+
+# Default relationship labels used when the LLM stage is skipped
+DEFAULT_EDGE_LABELS = {
+    "IP": "uses IP",
+    "Hash": "linked to artifact",
+    "Email": "uses email",
+    "Phone": "uses phone",
+    "File": "handled file",
+    "Alias": "also known as",
+    "Organization": "associated with",
+}
+
+def _phone_digits(candidate):
+    return re.sub(r"\D", "", candidate)
+
+def _is_phone(candidate):
+    """Filters out dates, times and version strings that look like phone numbers."""
+    digits = _phone_digits(candidate)
+    if not 8 <= len(digits) <= 15:
+        return False
+    if IPV4_RE.fullmatch(candidate.strip()):
+        return False
+    # Dates such as 2024-12-10 or 10.12.2024
+    if re.fullmatch(r"\d{2,4}[-/.]\d{1,2}[-/.]\d{1,4}", candidate.strip()):
+        return False
+    return True
+
+def extract_entities(dossier_text, meta=None):
+    """
+    Rule-based entity extraction over a dossier.
+    Returns a list of node dicts ({id, label, type}) with the suspect as the first node.
+    """
+    meta = meta or {}
+    nodes = []
+    seen = set()
+
+    def add(node_id, label, n_type):
+        key = str(node_id).strip().lower()
+        if not key or key in seen:
+            return
+        seen.add(key)
+        nodes.append({"id": str(node_id).strip(), "label": str(label).strip(), "type": n_type})
+
+    # 1. Suspect is always the central node
+    suspect_label = meta.get("full_name") or meta.get("suspect_id") or "Suspect"
+    suspect_id = meta.get("suspect_id") or suspect_label
+    add(suspect_id, suspect_label, "Person")
+
+    # 2. Aliases from the structured record + quoted aliases in free text
+    for alias in meta.get("aliases", []) or []:
+        add(alias, alias, "Alias")
+    for match in QUOTED_ALIAS_RE.finditer(dossier_text):
+        add(match.group(1), match.group(1), "Alias")
+
+    # 3. Technical indicators
+    emails = EMAIL_RE.findall(dossier_text)
+    for email in emails:
+        add(email.lower(), email, "Email")
+    for ip in IPV4_RE.findall(dossier_text):
+        add(ip, ip, "IP")
+    for h in HASH_RE.findall(dossier_text):
+        add(h.lower(), h, "Hash")
+
+    email_spans = " ".join(emails)
+    for match in FILE_RE.finditer(dossier_text):
+        name = match.group(0)
+        if name in email_spans:
+            continue
+        add(name, name, "File")
+
+    for match in PHONE_RE.finditer(dossier_text):
+        candidate = match.group(0).strip()
+        if _is_phone(candidate):
+            add(_phone_digits(candidate), candidate, "Phone")
+
+    # 4. Organizations (gazetteer first so canonical spellings win)
+    for match in _GAZETTEER_RE.finditer(dossier_text):
+        canonical = next(o for o in KNOWN_ORGANIZATIONS if o.lower() == match.group(1).lower())
+        add(canonical, canonical, "Organization")
+    for match in ORG_SUFFIX_RE.finditer(dossier_text):
+        add(match.group(1), match.group(1), "Organization")
+
+    return nodes
+
+def build_default_edges(nodes):
+    """Star topology from the suspect to every extracted entity (used when the LLM is skipped)."""
+    if not nodes:
+        return []
+    suspect_id = nodes[0]["id"]
+    return [
+        {"source": suspect_id, "target": n["id"], "label": DEFAULT_EDGE_LABELS.get(n["type"], "linked to")}
+        for n in nodes[1:]
+    ]
+
+def select_relevant_sentences(dossier_text, nodes):
+    """
+    Keeps only the sentences that mention at least one extracted entity,
+    so the relationship prompt carries evidence instead of the whole dossier.
+    """
+    needles = [n["label"].lower() for n in nodes[1:] if n["label"]]
+    if not needles:
+        return dossier_text
+
+    kept = []
+    for sentence in SENTENCE_SPLIT_RE.split(dossier_text):
+        sentence = sentence.strip()
+        lowered = sentence.lower()
+        if sentence and any(needle in lowered for needle in needles):
+            kept.append(sentence)
+    return "\n".join(kept) if kept else dossier_text
@@ -0,0 +1,88 @@
+import re
+
+def normalize_entity_key(value):
+    """
+    Canonical lookup key for an entity id or label.
+    'Norbitex  Cloud Solutions.' and 'norbitex cloud solutions' resolve to the same key,
+    while IPs, emails and file names keep their dots and '@'.
+    """
+    key = str(value or "").strip().lower()
+    key = re.sub(r"\s+", " ", key)
+    key = re.sub(r"[^\w .@:/+-]", "", key)
+    return key.strip(" .")
+
+def normalize_edge_label(label):
+    return re.sub(r"\s+", " ", str(label or "").strip().lower())
+
+class EntityResolver:
+    """
+    Resolves node ids and labels coming from independent extractions
+    (dossier segments, repeated LLM calls) onto one canonical node each.
+    """
+
+    def __init__(self, nodes=None):
+        self.nodes = {}       # canonical id -> node dict
+        self.key_to_id = {}   # normalized id/label -> canonical id
+        for node in nodes or []:
+            self.add_node(node)
+
+    def resolve(self, value):
+        """Returns the canonical id for an id or label, or None if unknown."""
+        return self.key_to_id.get(normalize_entity_key(value))
+
+    def add_node(self, node):
+        """
+        Registers a node, merging it into an existing one when its id or label
+        already resolves. Returns (canonical_id, is_new).
+        """
+        node_id = str(node.get("id", "")).strip()
+        label = str(node.get("label") or node_id).strip()
+        if not node_id:
+            return None, False
+
+        canonical = self.resolve(node_id) or self.resolve(label)
+        if canonical:
+            existing = self.nodes[canonical]
+            # Prefer a specific type over the generic fallback
+            if existing.get("type", "Unknown") == "Unknown" and node.get("type"):
+                existing["type"] = node["type"]
+            self.key_to_id.setdefault(normalize_entity_key(label), canonical)
+            return canonical, False
+
+        self.nodes[node_id] = {"id": node_id, "label": label, "type": node.get("type", "Unknown")}
+        self.key_to_id[normalize_entity_key(node_id)] = node_id
+        self.key_to_id.setdefault(normalize_entity_key(label), node_id)
+        return node_id, True
+
+    def resolve_edge(self, edge):
+        """Maps an edge onto canonical ids. Returns None if either endpoint is unknown."""
+        source = self.resolve(edge.get("source"))
+        target = self.resolve(edge.get("target"))
+        if not source or not target or source == target:
+            return None
+        return {"source": source, "target": target, "label": str(edge.get("label", "")).strip()}
+
+def merge_subgraphs(subgraphs, resolver=None):
+    """
+    Reduce step: merges {nodes, edges} sub-graphs into one graph with resolved,
+    deduplicated entities. Sub-graphs are consumed as they arrive, and
+    ("node", dict) / ("edge", dict) events are yielded for every node and edge
+    not seen before. A resolver seeded with already known nodes keeps their ids
+    canonical and stops them from being yielded again.
+    """
+    resolver = resolver or EntityResolver()
+    seen_edges = set()
+    for sub in subgraphs:
+        for node in sub.get("nodes", []):
+            canonical, is_new = resolver.add_node(node)
+            if is_new:
+                yield "node", resolver.nodes[canonical]
+
+        for edge in sub.get("edges", []):
+            resolved = resolver.resolve_edge(edge)
+            if not resolved:
+                continue
+            key = (resolved["source"], resolved["target"], normalize_edge_label(resolved["label"]))
+            if key not in seen_edges:
+                seen_edges.add(key)
+                yield "edge", resolved
@@ -1,12 +1,25 @@
 import os
+import time
 from modules.forensic.vector_store import find_match
-from modules.forensic.rag_engine import generate_graph_data, get_suspect_metadata
-from modules.forensic.graph_builder import build_interactive_graph
+from modules.forensic.rag_engine import stream_graph_data, get_suspect_metadata
+from modules.forensic.graph_builder import render_graph_html
+from modules.forensic.graph_summary import summarize_graph
+from modules.forensic.graph_store import save_graph_version
+from modules.forensic.knowledge_graph import get_knowledge_graph, METHOD_LLM, METHOD_RULES
 
-def process_suspect_image(image_path):
+LIVE_UPDATE_INTERVAL = 0.5  # Seconds between partial graph callbacks while streaming
+
+def process_suspect_image(image_path, use_llm=True, on_graph_update=None, refresh_graph=False):
     """
     Master Orchestrator for the Biometric Graph-RAG Pipeline.
     Takes an image path, runs the full forensic pipeline, and returns the results.
+    Set use_llm=False for an instant, rule-based graph without the LLM call.
+    If on_graph_update is given, it is called with the partial graph data
+    while the extraction streams, so the UI can grow the network view live.
+    Suspects already in the global knowledge graph are served from a k-hop
+    neighbourhood query unless refresh_graph=True forces a new extraction,
+    which replaces the suspect's previous graph. A suspect indexed by an
+    instant run is re-extracted the first time an LLM graph is requested.
     """
     print(f"\n[🚀] FORENSIC ENGINE STARTED: Processing {os.path.basename(image_path)}")
     
@@ -16,7 +29,11 @@ def process_suspect_image(image_path):
         "match_id": None,
         "score": None,
         "metadata": None,
-        "graph_html_path": None
+        "graph_data": None,
+        "graph_html": None,
+        "clusters": [],
+        "graph_version": None,
+        "linked_suspects": []
     }
 
     # ---------------------------------------------------------
@@ -48,23 +65,61 @@ def process_suspect_image(image_path):
         return result_package
 
     # ---------------------------------------------------------
-    # STEP 3: Graph RAG Extraction (LLM)
+    # STEP 3: Graph RAG Extraction (or Knowledge Graph lookup)
     # ---------------------------------------------------------
-    print("[*] Step 3: Extracting Interconnected Network Graph via LLM...")
-    graph_data = generate_graph_data(matched_id)
+    knowledge_graph = get_knowledge_graph()
+    method = METHOD_LLM if use_llm else METHOD_RULES
+    # An LLM graph also serves instant runs; a rule-based one never stands in for the LLM
+    cached = knowledge_graph.has_suspect(matched_id, method=METHOD_LLM if use_llm else None)
+    
+    if cached and not refresh_graph:
+        print("[*] Step 3: Suspect already indexed. Querying global knowledge graph...")
+        graph_data = knowledge_graph.suspect_neighbourhood(matched_id)
+        if on_graph_update:
+            on_graph_update(graph_data)
+    else:
+        print("[*] Step 3: Extracting Interconnected Network Graph...")
+        graph_data = {"nodes": [], "edges": []}
+        last_update = 0.0
+        for kind, item in stream_graph_data(matched_id, use_llm=use_llm):
+            graph_data["nodes" if kind == "node" else "edges"].append(item)
+            
+            # Throttle live renders so the UI isn't redrawn on every single edge
+            if on_graph_update and time.monotonic() - last_update >= LIVE_UPDATE_INTERVAL:
+                on_graph_update(graph_data)
+                last_update = time.monotonic()
+        
+        # Fold the new extraction into the cross-suspect graph, then show the
+        # suspect's neighbourhood so shared infrastructure with other suspects appears
+        if graph_data["nodes"]:
+            knowledge_graph.merge(matched_id, graph_data, method=method)
+            graph_data = knowledge_graph.suspect_neighbourhood(matched_id)
+    
+    result_package["linked_suspects"] = sorted(knowledge_graph.linked_suspects(matched_id))
+    
+    result_package["graph_data"] = graph_data
     
     if not graph_data or not graph_data.get("nodes"):
         result_package["status"] = "partial_success"
         result_package["message"] = "Match found, but the LLM failed to extract network graph data."
         return result_package
 
+    # Persist a compact, versioned copy so re-extractions can be shipped as deltas
+    try:
+        result_package["graph_version"] = save_graph_version(matched_id, graph_data)
+    except OSError as e:
+        print(f"[-] Failed to store graph version: {e}")
+
     # ---------------------------------------------------------
     # STEP 4: Build Interactive Visualization
     # ---------------------------------------------------------
-    print("[*] Step 4: Rendering PyVis HTML Graph...")
-    html_path = build_interactive_graph(graph_data)
+    print("[*] Step 4: Rendering PyVis HTML Graph (in memory)...")
+    # Large networks are collapsed into communities; only the visible level is rendered
+    display_graph, clusters = summarize_graph(graph_data)
+    result_package["clusters"] = clusters
+    graph_html = render_graph_html(display_graph)
     
-    if not html_path:
+    if not graph_html:
         result_package["status"] = "partial_success"
         result_package["message"] = "Match and graph extracted, but failed to render HTML."
         return result_package
@@ -75,6 +130,6 @@ def process_suspect_image(image_path):
     print("[🚀] FORENSIC ENGINE COMPLETE: Output generated successfully.\n")
     result_package["status"] = "success"
     result_package["message"] = "Biometric match and graph generation successful."
-    result_package["graph_html_path"] = html_path
+    result_package["graph_html"] = graph_html
     
     return result_package
\ No newline at end of file
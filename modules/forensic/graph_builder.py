@@ -1,13 +1,70 @@
 import os
-import networkx as nx
+import json
+import hashlib
+import threading
+from string import Template
 from pyvis.network import Network
+from modules.forensic.graph_layout import get_layout
 
 # =====================================================================
 # CONFIGURATION & PATHS
 # =====================================================================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 OUTPUT_DIR = os.path.join(BASE_DIR, "outputs", "graphs")
-GRAPH_OUTPUT_PATH = os.path.join(OUTPUT_DIR, "suspect_graph.html")
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "graph_template.html")
+
+# Where the browser fetches the shared vis-network assets from. Streamlit serves
+# ./static at /app/static (see .streamlit/config.toml), so every graph page
+# references the same cacheable local copy instead of inlining or fetching it.
+ASSET_BASE_URL = os.environ.get("EVOFORENSIC_ASSET_URL", "/app/static/lib")
+
+# Graphs larger than this get server-side layouts instead of in-browser physics
+PRECOMPUTED_LAYOUT_THRESHOLD = 150
+
+# In-browser forceAtlas2 physics: nice for small graphs, freezes the browser for big ones
+PHYSICS_OPTIONS = """
+var options = {
+  "physics": {
+    "forceAtlas2Based": {
+      "gravitationalConstant": -100,
+      "centralGravity": 0.01,
+      "springLength": 200,
+      "springConstant": 0.08
+    },
+    "maxVelocity": 50,
+    "solver": "forceAtlas2Based",
+    "timestep": 0.35,
+    "stabilization": {"iterations": 150}
+  },
+  "edges": {
+    "smooth": {
+      "type": "dynamic"
+    },
+    "font": {
+      "color": "#aaaaaa",
+      "size": 12,
+      "background": "none"
+    }
+  }
+}
+"""
+
+# Positions come from the server, so the browser only draws
+STATIC_LAYOUT_OPTIONS = """
+var options = {
+  "physics": {"enabled": false},
+  "layout": {"improvedLayout": false},
+  "interaction": {"hideEdgesOnDrag": true},
+  "edges": {
+    "smooth": false,
+    "font": {
+      "color": "#aaaaaa",
+      "size": 12,
+      "background": "none"
+    }
+  }
+}
+"""
 
 def ensure_output_dir():
     """Ensure the outputs/graphs directory exists."""
@@ -28,16 +85,142 @@ def get_node_color(node_type):
         return "#b04bff"  # Purple
     elif "location" in node_type:
         return "#4bffb0"  # Teal
+    elif "alias" in node_type:
+        return "#ff8c8c"  # Light Red
+    elif "email" in node_type or "phone" in node_type:
+        return "#8cc8ff"  # Light Blue
+    elif "file" in node_type or "hash" in node_type:
+        return "#ffe14b"  # Yellow
+    elif "cluster" in node_type:
+        return "#64ffda"  # Cyan (collapsed community)
     else:
         return "#cccccc"  # Light Grey fallback
 
-def build_interactive_graph(graph_data):
+def prepare_graph(graph_data):
     """
-    Takes a dictionary containing 'nodes' and 'edges' and generates 
-    an interactive PyVis HTML file.
+    Indexes and deduplicates raw graph data in a single pass.
+    LLM output often repeats the same node or edge; nodes are keyed by id and
+    edges by (source, target), so every lookup is O(1) and the whole pass is O(N + E).
+    Duplicate nodes keep their first label and collect the alternatives;
+    parallel edges merge their distinct relationship labels.
+    Returns (nodes, edges) as insertion-ordered dicts.
+    """
+    nodes = {}
+    for node in graph_data.get("nodes", []):
+        node_id = node.get("id")
+        if node_id is None:
+            continue
+        label = node.get("label") or node_id
+        n_type = node.get("type", "Unknown")
+
+        existing = nodes.get(node_id)
+        if existing is None:
+            nodes[node_id] = {
+                "id": node_id, "label": label, "type": n_type, "aliases": [],
+                "title": node.get("title"), "size": node.get("size"),
+            }
+            continue
+        if label != existing["label"] and label not in existing["aliases"]:
+            existing["aliases"].append(label)
+        if existing["type"] == "Unknown" and n_type != "Unknown":
+            existing["type"] = n_type
+
+    edges = {}
+    for edge in graph_data.get("edges", []):
+        source = edge.get("source")
+        target = edge.get("target")
+        # Ensure both source and target exist in our nodes index to prevent PyVis errors
+        if source not in nodes or target not in nodes:
+            continue
+        label = edge.get("label", "")
+
+        labels = edges.get((source, target))
+        if labels is None:
+            edges[(source, target)] = [label] if label else []
+        elif label and label not in labels:
+            labels.append(label)
+
+    return nodes, edges
+
+def _node_options(node_id, node):
+    title = node.get("title") or f"Type: {node['type']}"  # Hover tooltip
+    if node["aliases"]:
+        title += f" | Also seen as: {', '.join(node['aliases'])}"
+    return {
+        "id": node_id,
+        "label": node["label"],
+        "shape": "dot",
+        "title": title,
+        "color": get_node_color(node["type"]),
+        "size": node.get("size") or 25,
+        "borderWidth": 2,
+        "borderWidthSelected": 4,
+    }
+
+def _edge_options(labels):
+    label = " / ".join(labels)
+    return {
+        "title": label,  # Hover tooltip
+        "label": label,  # Text on the line
+        "color": "#555555",
+        "arrows": "to",
+    }
+
+def _has_plain_storage(net):
+    """True when the Network keeps its data in the plain lists/dicts PyVis 0.3.x uses internally."""
+    return (
+        isinstance(getattr(net, "nodes", None), list)
+        and isinstance(getattr(net, "edges", None), list)
+        and isinstance(getattr(net, "node_ids", None), list)
+        and isinstance(getattr(net, "node_map", None), dict)
+    )
+
+def populate_network(net, nodes, edges):
+    """
+    Loads prepared nodes/edges into a PyVis Network.
+    PyVis' add_node/add_edge re-scan their id lists on every call (O(N) each),
+    so on PyVis versions with the known internal layout (pinned in
+    requirements.txt) the option dicts are built here and assigned directly.
+    Any other layout falls back to the public add_node/add_edge API.
+    """
+    if not _has_plain_storage(net):
+        for node_id, node in nodes.items():
+            options = _node_options(node_id, node)
+            del options["id"], options["shape"]
+            net.add_node(node_id, shape="dot", **options)
+        for (source, target), labels in edges.items():
+            net.add_edge(source, target, **_edge_options(labels))
+        return
+
+    net.nodes = []
+    net.node_map = {}
+    for node_id, node in nodes.items():
+        options = _node_options(node_id, node)
+        options["font"] = {"color": net.font_color}
+        net.nodes.append(options)
+        net.node_map[node_id] = options
+    net.node_ids = list(nodes)
+
+    net.edges = [
+        {"from": source, "to": target, **_edge_options(labels)}
+        for (source, target), labels in edges.items()
+    ]
+
+def apply_precomputed_layout(net, nodes, edges):
+    """Pins every node at its cached server-side position and takes it out of the physics simulation."""
+    positions = get_layout(nodes.keys(), edges.keys())
+    for options in net.nodes:
+        x, y = positions[str(options["id"])]
+        options["x"] = x
+        options["y"] = y
+        options["physics"] = False
+
+def create_network(graph_data, layout="auto"):
+    """
+    Builds a fully configured PyVis Network from graph data, or None if there are no nodes.
+    layout: "physics" (in-browser forceAtlas2), "precomputed" (server-side
+    positions, physics disabled) or "auto" to pick by graph size.
     """
-    ensure_output_dir()
-    
     print("[*] Initializing network graph builder...")
     
     # 1. Initialize PyVis Network (Dark Mode)
@@ -50,80 +233,95 @@ def build_interactive_graph(graph_data):
         directed=True
     )
     
-    # 2. Add Nodes
-    nodes = graph_data.get("nodes", [])
+    # 2. Index + deduplicate nodes and edges
+    nodes, edges = prepare_graph(graph_data)
     if not nodes:
         print("[-] No nodes found in graph data.")
         return None
         
-    for node in nodes:
-        node_id = node.get("id")
-        label = node.get("label", node_id)
-        n_type = node.get("type", "Unknown")
-        
-        # Add node with styling
-        net.add_node(
-            node_id, 
-            label=label, 
-            title=f"Type: {n_type}", # Hover tooltip
-            color=get_node_color(n_type),
-            size=25,
-            borderWidth=2,
-            borderWidthSelected=4
-        )
+    # 3. Add Nodes and Edges
+    populate_network(net, nodes, edges)
+            
+    # 4. Layout: in-browser physics for small graphs, precomputed positions for large ones
+    if layout == "auto":
+        layout = "precomputed" if len(nodes) > PRECOMPUTED_LAYOUT_THRESHOLD else "physics"
         
-    # 3. Add Edges
-    edges = graph_data.get("edges", [])
-    for edge in edges:
-        source = edge.get("source")
-        target = edge.get("target")
-        label = edge.get("label", "")
+    if layout == "precomputed":
+        apply_precomputed_layout(net, nodes, edges)
+        net.set_options(STATIC_LAYOUT_OPTIONS)
+    else:
+        net.set_options(PHYSICS_OPTIONS)
+    
+    return net
+
+_template = None
+
+def _get_template():
+    global _template
+    if _template is None:
+        with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+            _template = Template(f.read())
+    return _template
+
+def _script_json(value):
+    """JSON that is safe to embed inside a <script> block."""
+    return json.dumps(value).replace("</", "<\\/")
+
+def render_graph_html(graph_data, layout="auto", standalone=False):
+    """
+    Renders the interactive graph entirely in memory and returns the HTML string.
+    Nothing touches disk, so concurrent sessions can never overwrite each other's graph.
+    By default the page only carries the graph payload and links the shared,
+    browser-cached assets under ASSET_BASE_URL. standalone=True inlines the
+    libraries instead, for files that are opened outside the app.
+    """
+    net = create_network(graph_data, layout=layout)
+    if net is None:
+        return None
+    try:
+        if standalone:
+            net.cdn_resources = "in_line"
+            return net.generate_html()
         
-        # Ensure both source and target exist in our nodes list to prevent PyVis errors
-        node_ids = [n.get("id") for n in nodes]
-        if source in node_ids and target in node_ids:
-            net.add_edge(
-                source, 
-                target, 
-                title=label, # Hover tooltip
-                label=label, # Text on the line
-                color="#555555",
-                arrows="to"
-            )
-            
-    # 4. Configure Physics (Makes it bouncy and dynamic)
-    net.set_options("""
-    var options = {
-      "physics": {
-        "forceAtlas2Based": {
-          "gravitationalConstant": -100,
-          "centralGravity": 0.01,
-          "springLength": 200,
-          "springConstant": 0.08
-        },
-        "maxVelocity": 50,
-        "solver": "forceAtlas2Based",
-        "timestep": 0.35,
-        "stabilization": {"iterations": 150}
-      },
-      "edges": {
-        "smooth": {
-          "type": "dynamic"
-        },
-        "font": {
-          "color": "#aaaaaa",
-          "size": 12,
-          "background": "none"
-        }
-      }
-    }
-    """)
+        nodes, edges, _, height, width, options = net.get_network_data()
+        return _get_template().substitute(
+            asset_base=ASSET_BASE_URL,
+            nodes=_script_json(nodes),
+            edges=_script_json(edges),
+            options=options,
+            height=height,
+            width=width,
+            bgcolor=net.bgcolor,
+        )
+    except Exception as e:
+        print(f"[-] Failed to render graph: {e}")
+        return None
+
+def build_interactive_graph(graph_data, layout="auto"):
+    """
+    Takes a dictionary containing 'nodes' and 'edges' and generates 
+    an interactive PyVis HTML file.
+    The file name is the hash of its content (outputs/graphs/graph_<hash>.html),
+    so concurrent scans never collide and identical graphs are written once.
+    Files are standalone (libraries inlined) since they are opened outside the app.
+    """
+    html = render_graph_html(graph_data, layout=layout, standalone=True)
+    if html is None:
+        return None
+    
+    ensure_output_dir()
+    digest = hashlib.sha256(html.encode("utf-8")).hexdigest()[:16]
+    output_path = os.path.join(OUTPUT_DIR, f"graph_{digest}.html")
     
-    # 5. Export to HTML
+    # 5. Export to HTML (write-then-rename so readers never see a partial file)
     try:
-        net.save_graph(GRAPH_OUTPUT_PATH)
-        print(f"[+] Interactive graph successfully saved to: {GRAPH_OUTPUT_PATH}")
-        return GRAPH_OUTPUT_PATH
+        if not os.path.exists(output_path):
+            tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(tmp_path, output_path)
+        print(f"[+] Interactive graph successfully saved to: {output_path}")
+        return output_path
     except Exception as e:
         print(f"[-] Failed to save graph: {e}")
         return None
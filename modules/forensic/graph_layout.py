@@ -0,0 +1,220 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import eigsh
+
+# =====================================================================
+# CONFIGURATION & PATHS
+# =====================================================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LAYOUT_CACHE_DIR = os.path.join(BASE_DIR, "outputs", "layouts")
+
+FORCE_LAYOUT_MAX_NODES = 1000  # Above this a component uses the spectral layout (O(N^2) memory otherwise)
+FORCE_ITERATIONS = 60
+NODE_SPACING = 90               # Target pixel distance between neighbouring nodes
+MEMORY_CACHE_SIZE = 64
+DISK_CACHE_SIZE = 500           # Layout files kept on disk; least recently used are removed beyond this
+
+_memory_cache = OrderedDict()
+_memory_cache_lock = threading.Lock()
+
+def graph_hash(node_ids, edge_pairs):
+    """Structural hash of a graph: same nodes + same edges -> same layout."""
+    digest = hashlib.sha256()
+    for node_id in sorted(map(str, node_ids)):
+        digest.update(node_id.encode("utf-8") + b"\x00")
+    digest.update(b"\x01")
+    for source, target in sorted((str(s), str(t)) for s, t in edge_pairs):
+        digest.update(source.encode("utf-8") + b"\x00" + target.encode("utf-8") + b"\x00")
+    return digest.hexdigest()
+
+# =====================================================================
+# LAYOUT ALGORITHMS (NumPy-vectorized)
+# =====================================================================
+def force_directed_layout(n, src, dst, iterations=FORCE_ITERATIONS, seed=0):
+    """
+    Fruchterman-Reingold with all pairwise repulsion computed as one array op per iteration.
+    Returns an (n, 2) array of positions in roughly the unit square.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2), dtype=np.float32)
+    if n == 1:
+        return pos
+
+    k_sq = np.float32(1.0 / n)
+    k = np.sqrt(k_sq)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    displacement = np.empty((n, 2), dtype=np.float32)
+
+    for _ in range(iterations):
+        # Repulsion between all pairs, x and y kept as separate (n, n) planes to save memory
+        dx = pos[:, 0, None] - pos[None, :, 0]
+        dy = pos[:, 1, None] - pos[None, :, 1]
+        strength = dx * dx
+        strength += dy * dy
+        np.maximum(strength, 1e-6, out=strength)
+        np.divide(k_sq, strength, out=strength)
+        displacement[:, 0] = (dx * strength).sum(axis=1)
+        displacement[:, 1] = (dy * strength).sum(axis=1)
+
+        # Attraction along edges
+        if len(src):
+            edge_delta = pos[src] - pos[dst]
+            edge_dist = np.sqrt((edge_delta ** 2).sum(axis=-1))
+            pull = edge_delta * (edge_dist / k)[:, None]
+            np.subtract.at(displacement, src, pull)
+            np.add.at(displacement, dst, pull)
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=-1)), 1e-9)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    return pos
+
+def spectral_layout(n, src, dst, seed=0):
+    """
+    Positions from the two leading non-trivial eigenvectors of the normalized adjacency.
+    Sparse Lanczos keeps this fast for components with tens of thousands of nodes.
+    """
+    if n < 3:
+        return force_directed_layout(n, src, dst, seed=seed)
+
+    weights = np.ones(len(src))
+    adjacency = coo_matrix((weights, (src, dst)), shape=(n, n)).tocsr()
+    adjacency = adjacency + adjacency.T
+    degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+    inv_sqrt = 1.0 / np.sqrt(np.maximum(degrees, 1e-9))
+    normalized = adjacency.multiply(inv_sqrt[:, None]).multiply(inv_sqrt[None, :]).tocsr()
+
+    rng = np.random.default_rng(seed)
+    _, vectors = eigsh(normalized, k=3, which="LA", v0=rng.random(n))
+    pos = vectors[:, :2] * inv_sqrt[:, None]
+    pos -= pos.min(axis=0)
+    span = np.maximum(pos.max(axis=0), 1e-9)
+    # Small jitter separates structurally identical nodes (e.g. leaves of one hub)
+    return pos / span + rng.normal(scale=0.002, size=pos.shape)
+
+def _pack_components(component_positions):
+    """Places laid-out components on a grid, largest first, each scaled by sqrt(size)."""
+    order = sorted(component_positions, key=lambda item: len(item[0]), reverse=True)
+    columns = int(np.ceil(np.sqrt(len(order))))
+    cell = max(np.sqrt(len(order[0][0])), 1.0) * NODE_SPACING * 1.2
+
+    placed = {}
+    for i, (indices, pos) in enumerate(order):
+        scale = max(np.sqrt(len(indices)), 1.0) * NODE_SPACING
+        centered = (pos - pos.mean(axis=0)) * scale
+        offset = np.array([(i % columns) * cell, (i // columns) * cell])
+        for idx, xy in zip(indices, centered + offset):
+            placed[idx] = xy
+    return placed
+
+def compute_layout(node_ids, edge_pairs, seed=0):
+    """
+    Computes pixel positions for every node id: {id: (x, y)}.
+    Each connected component is laid out independently (force-directed for
+    small components, spectral for large ones) and the results are packed on a grid.
+    """
+    node_ids = list(node_ids)
+    n = len(node_ids)
+    if n == 0:
+        return {}
+
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    pairs = [(index[s], index[t]) for s, t in edge_pairs if s in index and t in index and s != t]
+    src = np.fromiter((p[0] for p in pairs), dtype=np.int64, count=len(pairs))
+    dst = np.fromiter((p[1] for p in pairs), dtype=np.int64, count=len(pairs))
+
+    graph = coo_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+    num_components, labels = connected_components(graph, directed=False)
+
+    # Group node indices per component and remap edges into component-local ids
+    members = [[] for _ in range(num_components)]
+    for i, label in enumerate(labels):
+        members[label].append(i)
+    local = np.empty(n, dtype=np.int64)
+    for indices in members:
+        local[indices] = np.arange(len(indices))
+    edge_component = labels[src]
+
+    component_positions = []
+    for c, indices in enumerate(members):
+        mask = edge_component == c
+        c_src, c_dst = local[src[mask]], local[dst[mask]]
+        if len(indices) > FORCE_LAYOUT_MAX_NODES:
+            pos = spectral_layout(len(indices), c_src, c_dst, seed=seed)
+        else:
+            pos = force_directed_layout(len(indices), c_src, c_dst, seed=seed)
+        component_positions.append((indices, pos))
+
+    placed = _pack_components(component_positions)
+    return {node_ids[i]: (float(xy[0]), float(xy[1])) for i, xy in placed.items()}
+
+# =====================================================================
+# CACHED ENTRY POINT
+# =====================================================================
+def _prune_disk_cache():
+    """Removes the least recently used layout files (by mtime) beyond DISK_CACHE_SIZE."""
+    entries = []
+    for name in os.listdir(LAYOUT_CACHE_DIR):
+        if name.endswith(".json"):
+            path = os.path.join(LAYOUT_CACHE_DIR, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue  # Removed by a concurrent prune
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - DISK_CACHE_SIZE)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def get_layout(node_ids, edge_pairs):
+    """
+    Returns cached positions for this graph structure, computing them once.
+    Positions are keyed by str(node id), the form they take in the JSON cache.
+    Cached in memory (LRU) and on disk under outputs/layouts/<graph hash>.json,
+    where at most DISK_CACHE_SIZE files are kept (live partial graphs add one each).
+    """
+    node_ids = list(node_ids)
+    edge_pairs = list(edge_pairs)
+    key = graph_hash(node_ids, edge_pairs)
+
+    with _memory_cache_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+
+    cache_path = os.path.join(LAYOUT_CACHE_DIR, f"{key}.json")
+    positions = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                positions = {node_id: tuple(xy) for node_id, xy in json.load(f).items()}
+            os.utime(cache_path)  # Marks it recently used for pruning
+        except (OSError, ValueError) as e:
+            print(f"[-] Ignoring unreadable layout cache {cache_path}: {e}")
+
+    if positions is None:
+        print(f"[*] Computing server-side layout for {len(node_ids)} nodes...")
+        positions = {str(node_id): xy for node_id, xy in compute_layout(node_ids, edge_pairs).items()}
+        os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+        # Unique temp file: sessions laying out the same graph must not share one
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=LAYOUT_CACHE_DIR, suffix=".tmp", delete=False) as f:
+            json.dump(positions, f)
+        os.replace(f.name, cache_path)
+        _prune_disk_cache()
+
+    with _memory_cache_lock:
+        _memory_cache[key] = positions
+        if len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+    return positions
@@ -0,0 +1,210 @@
+import threading
+from collections import OrderedDict, deque
+from modules.forensic.entity_resolution import normalize_entity_key
+
+QUERY_CACHE_SIZE = 1024  # Max cached query results per index
+
+class GraphIndex:
+    """
+    Read-only query index over {nodes, edges} graph data.
+    Adjacency sets and degrees are precomputed once, and query results are
+    kept in a bounded LRU cache, so path and neighbourhood questions stay
+    interactive on graphs with hundreds of thousands of edges.
+    Direction is ignored for connectivity queries: "A used IP X" and
+    "IP X was used by B" both connect A and B.
+    The index is shared across Streamlit sessions: the cache is locked, and
+    results are frozensets, tuples or fresh dicts, so callers cannot alter cached state.
+    """
+
+    def __init__(self, graph_data, version=None):
+        self.version = version
+        self.nodes = {}        # id -> node dict
+        self.key_to_id = {}    # normalized id/label -> id
+        self.adjacency = {}    # id -> set(neighbour ids), undirected
+        self.edge_labels = {}  # (source, target) -> label, directed as extracted
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+        for node in graph_data.get("nodes", []):
+            node_id = node.get("id")
+            if node_id is None or node_id in self.nodes:
+                continue
+            self.nodes[node_id] = node
+            self.adjacency[node_id] = set()
+            self.key_to_id.setdefault(normalize_entity_key(node_id), node_id)
+            self.key_to_id.setdefault(normalize_entity_key(node.get("label")), node_id)
+
+        for edge in graph_data.get("edges", []):
+            source, target = edge.get("source"), edge.get("target")
+            if source not in self.adjacency or target not in self.adjacency or source == target:
+                continue
+            self.adjacency[source].add(target)
+            self.adjacency[target].add(source)
+            self.edge_labels.setdefault((source, target), edge.get("label", ""))
+
+        self.degrees = {node_id: len(neigh) for node_id, neigh in self.adjacency.items()}
+
+    # -----------------------------------------------------------------
+    # Helpers
+    # -----------------------------------------------------------------
+    def resolve(self, value):
+        """Accepts a node id or a human label ('Philip Menon', '185.92.61.22') and returns the node id."""
+        if value in self.nodes:
+            return value
+        return self.key_to_id.get(normalize_entity_key(value))
+
+    def _cached(self, key, compute):
+        """
+        LRU-cached query result. compute() must return immutable values (tuples,
+        frozensets) or a dict of them; dicts are copied on the way out.
+        """
+        with self.cache_lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                result = self.cache[key]
+                return dict(result) if isinstance(result, dict) else result
+        result = compute()
+        with self.cache_lock:
+            self.cache[key] = result
+            if len(self.cache) > QUERY_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return dict(result) if isinstance(result, dict) else result
+
+    def edge_label(self, a, b):
+        return self.edge_labels.get((a, b)) or self.edge_labels.get((b, a), "")
+
+    # -----------------------------------------------------------------
+    # Queries
+    # -----------------------------------------------------------------
+    def shortest_path(self, source, target):
+        """
+        Shortest undirected path between two entities as a tuple of node ids,
+        or None if they are not connected. Uses bidirectional BFS.
+        """
+        a, b = self.resolve(source), self.resolve(target)
+        if a is None or b is None:
+            return None
+        return self._cached(("path", a, b), lambda: self._bidirectional_bfs(a, b))
+
+    def _bidirectional_bfs(self, a, b):
+        if a == b:
+            return (a,)
+
+        parents_a = {a: None}
+        parents_b = {b: None}
+        frontier_a, frontier_b = [a], [b]
+        swapped = False
+
+        while frontier_a and frontier_b:
+            # Always expand the smaller frontier
+            if len(frontier_a) > len(frontier_b):
+                frontier_a, frontier_b = frontier_b, frontier_a
+                parents_a, parents_b = parents_b, parents_a
+                swapped = not swapped
+
+            next_frontier = []
+            for node in frontier_a:
+                for neighbour in self.adjacency[node]:
+                    if neighbour in parents_a:
+                        continue
+                    parents_a[neighbour] = node
+                    if neighbour in parents_b:
+                        path = self._join_paths(neighbour, parents_a, parents_b)
+                        return tuple(path[::-1] if swapped else path)
+                    next_frontier.append(neighbour)
+            frontier_a = next_frontier
+
+        return None
+
+    @staticmethod
+    def _join_paths(meeting, parents_a, parents_b):
+        left = []
+        node = meeting
+        while node is not None:
+            left.append(node)
+            node = parents_a[node]
+        left.reverse()
+
+        node = parents_b[meeting]
+        while node is not None:
+            left.append(node)
+            node = parents_b[node]
+        return left
+
+    def path_with_labels(self, source, target):
+        """Shortest path rendered as (from, relationship, to) hops for display."""
+        path = self.shortest_path(source, target)
+        if not path:
+            return []
+        return [(u, self.edge_label(u, v), v) for u, v in zip(path, path[1:])]
+
+    def k_hop(self, center, k=2):
+        """All entities within k hops of center, mapped to their hop distance."""
+        start = self.resolve(center)
+        if start is None:
+            return {}
+
+        def compute():
+            distances = {start: 0}
+            queue = deque([start])
+            while queue:
+                node = queue.popleft()
+                if distances[node] == k:
+                    continue
+                for neighbour in self.adjacency[node]:
+                    if neighbour not in distances:
+                        distances[neighbour] = distances[node] + 1
+                        queue.append(neighbour)
+            return distances
+
+        return self._cached(("khop", start, k), compute)
+
+    def subgraph(self, node_ids):
+        """{nodes, edges} for the given ids, e.g. the result of k_hop()."""
+        node_ids = {n for n in node_ids if n in self.nodes}
+        edges = []
+        for u in node_ids:
+            for v in self.adjacency[u]:
+                if v in node_ids and (u, v) in self.edge_labels:
+                    edges.append({"source": u, "target": v, "label": self.edge_labels[(u, v)]})
+        return {"nodes": [self.nodes[n] for n in node_ids], "edges": edges}
+
+    def common_neighbours(self, a, b):
+        """Entities directly connected to both a and b (e.g. shared IPs or organizations)."""
+        x, y = self.resolve(a), self.resolve(b)
+        if x is None or y is None:
+            return frozenset()
+        key = ("common",) + tuple(sorted((x, y)))
+        return self._cached(key, lambda: frozenset(self.adjacency[x] & self.adjacency[y]))
+
+    def shares_infrastructure_with(self, entity, types=("IP", "Organization", "Email", "Phone", "Hash", "File")):
+        """
+        Other Person nodes reachable through one shared entity of the given types.
+        Returns {person_id: frozenset(shared entity ids)}.
+        """
+        start = self.resolve(entity)
+        if start is None:
+            return {}
+        wanted = {t.lower() for t in types}
+
+        def compute():
+            shared = {}
+            for via in self.adjacency[start]:
+                if str(self.nodes[via].get("type", "")).lower() not in wanted:
+                    continue
+                for other in self.adjacency[via]:
+                    if other != start and str(self.nodes[other].get("type", "")).lower() == "person":
+                        shared.setdefault(other, set()).add(via)
+            return {other: frozenset(via) for other, via in shared.items()}
+
+        return self._cached(("shares", start, tuple(sorted(wanted))), compute)
+
+    def degree_centrality(self, top_n=None):
+        """Normalized degree centrality, highest first. Precomputed degrees make this O(N log N)."""
+        def compute():
+            scale = 1.0 / (len(self.nodes) - 1) if len(self.nodes) > 1 else 0.0
+            ranked = sorted(((n, d * scale) for n, d in self.degrees.items()), key=lambda item: item[1], reverse=True)
+            return tuple(ranked)
+
+        ranked = self._cached(("centrality",), compute)
+        return list(ranked[:top_n] if top_n else ranked)
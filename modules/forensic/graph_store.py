@@ -0,0 +1,194 @@
+import os
+import io
+import re
+import gzip
+import json
+import hashlib
+import tempfile
+import threading
+import networkx as nx
+
+# =====================================================================
+# CONFIGURATION & PATHS
+# =====================================================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STORE_DIR = os.path.join(BASE_DIR, "outputs", "graphs", "store")
+FORMAT_VERSION = 1
+MAX_VERSIONS = 20  # Versions kept per graph key; older blobs are deleted (clients on them get the full graph)
+
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+# =====================================================================
+# COMPACT SERIALIZATION
+# =====================================================================
+def _canonical(graph_data):
+    """
+    Canonical compact form: nodes sorted by id as [id, label, type] rows and
+    edges as [source_index, target_index, label] rows into that node table.
+    Identical graphs always produce identical bytes, which makes the hash a version id.
+    """
+    nodes = {}
+    for node in graph_data.get("nodes", []):
+        node_id = node.get("id")
+        if node_id is not None and node_id not in nodes:
+            nodes[node_id] = [str(node_id), str(node.get("label", node_id)), str(node.get("type", "Unknown"))]
+
+    node_rows = [nodes[k] for k in sorted(nodes, key=str)]
+    position = {row[0]: i for i, row in enumerate(node_rows)}
+
+    edge_rows = set()
+    for edge in graph_data.get("edges", []):
+        source, target = str(edge.get("source")), str(edge.get("target"))
+        if source in position and target in position:
+            edge_rows.add((position[source], position[target], str(edge.get("label", ""))))
+
+    return {"format": FORMAT_VERSION, "nodes": node_rows, "edges": sorted(edge_rows)}
+
+def _canonical_bytes(canonical):
+    return json.dumps(canonical, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def graph_version(graph_data):
+    """Content hash of a graph; changes whenever any node or edge changes."""
+    return hashlib.sha256(_canonical_bytes(_canonical(graph_data))).hexdigest()[:16]
+
+def serialize_graph(graph_data):
+    """Gzip-compressed JSON adjacency. Returns (version, bytes)."""
+    raw = _canonical_bytes(_canonical(graph_data))
+    # mtime=0 keeps the compressed bytes deterministic as well
+    return hashlib.sha256(raw).hexdigest()[:16], gzip.compress(raw, mtime=0)
+
+def deserialize_graph(blob):
+    """Inverse of serialize_graph: bytes -> {nodes, edges}."""
+    canonical = json.loads(gzip.decompress(blob).decode("utf-8"))
+    rows = canonical["nodes"]
+    return {
+        "nodes": [{"id": node_id, "label": label, "type": n_type} for node_id, label, n_type in rows],
+        "edges": [{"source": rows[s][0], "target": rows[t][0], "label": label} for s, t, label in canonical["edges"]],
+    }
+
+def export_graphml(graph_data):
+    """GraphML string for external tools (Gephi, Maltego, yEd)."""
+    graph = nx.MultiDiGraph()
+    for node in graph_data.get("nodes", []):
+        graph.add_node(node["id"], label=str(node.get("label", node["id"])), type=str(node.get("type", "Unknown")))
+    for edge in graph_data.get("edges", []):
+        if edge.get("source") in graph and edge.get("target") in graph:
+            graph.add_edge(edge["source"], edge["target"], label=str(edge.get("label", "")))
+    buffer = io.BytesIO()
+    nx.write_graphml(graph, buffer)
+    return buffer.getvalue().decode("utf-8")
+
+# =====================================================================
+# DELTAS
+# =====================================================================
+def _edge_key(edge):
+    return (edge["source"], edge["target"], edge.get("label", ""))
+
+def diff_graphs(old_graph, new_graph):
+    """
+    Node/edge delta turning old_graph into new_graph.
+    Nodes whose label or type changed are listed under changed_nodes.
+    Every list is sorted (nodes by id, edges by source/target/label), so the
+    same two versions always produce the same delta.
+    """
+    old_canon = deserialize_graph(serialize_graph(old_graph)[1])
+    new_canon = deserialize_graph(serialize_graph(new_graph)[1])
+
+    old_nodes = {n["id"]: n for n in old_canon["nodes"]}
+    new_nodes = {n["id"]: n for n in new_canon["nodes"]}
+    old_edges = {_edge_key(e): e for e in old_canon["edges"]}
+    new_edges = {_edge_key(e): e for e in new_canon["edges"]}
+
+    return {
+        "from_version": graph_version(old_graph),
+        "to_version": graph_version(new_graph),
+        "added_nodes": [new_nodes[k] for k in sorted(new_nodes.keys() - old_nodes.keys())],
+        "removed_nodes": sorted(old_nodes.keys() - new_nodes.keys()),
+        "changed_nodes": [new_nodes[k] for k in sorted(new_nodes.keys() & old_nodes.keys()) if new_nodes[k] != old_nodes[k]],
+        "added_edges": [new_edges[k] for k in sorted(new_edges.keys() - old_edges.keys())],
+        "removed_edges": [old_edges[k] for k in sorted(old_edges.keys() - new_edges.keys())],
+    }
+
+# =====================================================================
+# VERSIONED PERSISTENCE
+# =====================================================================
+def _graph_dir(graph_key):
+    safe_key = re.sub(r"[^\w.-]", "_", str(graph_key).lower())
+    return os.path.join(STORE_DIR, safe_key)
+
+def _atomic_write(directory, name, data):
+    """Write-then-rename through a unique temp file, so concurrent saves never share a partial file."""
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=f"{name}.", suffix=".tmp", delete=False) as f:
+        f.write(data)
+    os.replace(f.name, os.path.join(directory, name))
+
+def _read_manifest(graph_key):
+    path = os.path.join(_graph_dir(graph_key), "manifest.json")
+    if not os.path.exists(path):
+        return {"versions": []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _key_lock(graph_key):
+    directory = _graph_dir(graph_key)
+    with _key_locks_lock:
+        return _key_locks.setdefault(directory, threading.Lock())
+
+def save_graph_version(graph_key, graph_data, max_versions=MAX_VERSIONS):
+    """
+    Persists a graph under graph_key (e.g. a suspect id) if it differs from the latest version.
+    Only the last max_versions versions are kept. Returns the version hash.
+    """
+    version, blob = serialize_graph(graph_data)
+    directory = _graph_dir(graph_key)
+    # The manifest is read-modify-write: concurrent saves of one key must not drop each other's version
+    with _key_lock(graph_key):
+        manifest = _read_manifest(graph_key)
+        versions = manifest["versions"]
+        if versions and versions[-1] == version:
+            return version
+
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(os.path.join(directory, f"{version}.json.gz")):
+            _atomic_write(directory, f"{version}.json.gz", blob)
+
+        # A graph that returns to an earlier state moves that version to the end
+        versions = [v for v in versions if v != version] + [version]
+        expired, manifest["versions"] = versions[:-max_versions], versions[-max_versions:]
+        _atomic_write(directory, "manifest.json", json.dumps(manifest).encode("utf-8"))
+        for old in expired:
+            try:
+                os.remove(os.path.join(directory, f"{old}.json.gz"))
+            except OSError:
+                pass  # Already gone
+    print(f"[+] Graph '{graph_key}' stored as version {version} ({len(blob)} bytes compressed).")
+    return version
+
+def load_graph_version(graph_key, version=None):
+    """Loads a stored version (latest if None). Returns None if it does not exist."""
+    if version is None:
+        versions = _read_manifest(graph_key)["versions"]
+        if not versions:
+            return None
+        version = versions[-1]
+    blob_path = os.path.join(_graph_dir(graph_key), f"{version}.json.gz")
+    try:
+        with open(blob_path, 'rb') as f:
+            return deserialize_graph(f.read())
+    except FileNotFoundError:
+        return None  # Never stored, or expired by a concurrent save
+
+def get_delta(graph_key, since_version):
+    """
+    Delta from a client's version to the latest stored one.
+    Returns None when the client is already up to date, or the full latest
+    graph as an 'added' delta if the client's version is unknown.
+    """
+    latest = load_graph_version(graph_key)
+    if latest is None:
+        return None
+    if graph_version(latest) == since_version:
+        return None
+    previous = load_graph_version(graph_key, since_version) or {"nodes": [], "edges": []}
+    return diff_graphs(previous, latest)
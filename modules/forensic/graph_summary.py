@@ -0,0 +1,111 @@
+import threading
+from collections import Counter, OrderedDict
+import networkx as nx
+from modules.forensic.graph_builder import prepare_graph
+from modules.forensic.graph_layout import graph_hash
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+SUMMARY_NODE_THRESHOLD = 300  # Graphs above this many nodes are shown as collapsed communities
+CLUSTER_PREFIX = "cluster:"
+COMMUNITY_CACHE_SIZE = 32
+
+_community_cache = OrderedDict()
+_community_cache_lock = threading.Lock()  # Shared by every session's render thread
+
+def detect_communities(nodes, edges):
+    """
+    Louvain community detection over the undirected graph.
+    Returns a list of member-id lists, largest community first.
+    Cached per structural graph hash, since re-expanding a cluster must not reshuffle the others.
+    """
+    key = graph_hash(nodes.keys(), edges.keys())
+    with _community_cache_lock:
+        if key in _community_cache:
+            _community_cache.move_to_end(key)
+            return _community_cache[key]
+
+    graph = nx.Graph()
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from(edges.keys())
+
+    communities = nx.community.louvain_communities(graph, seed=42)
+    # Deterministic ordering so cluster ids are stable between renders
+    communities = sorted((sorted(c, key=str) for c in communities), key=lambda c: (-len(c), str(c[0])))
+
+    with _community_cache_lock:
+        _community_cache[key] = communities
+        if len(_community_cache) > COMMUNITY_CACHE_SIZE:
+            _community_cache.popitem(last=False)
+    return communities
+
+def _cluster_node(index, members, nodes, degree):
+    """Super-node describing a collapsed community: named after its best-connected member."""
+    hub = max(members, key=lambda m: degree.get(m, 0))
+    type_counts = Counter(nodes[m]["type"] for m in members)
+    breakdown = ", ".join(f"{count} {n_type}" for n_type, count in type_counts.most_common())
+    return {
+        "id": f"{CLUSTER_PREFIX}{index}",
+        "label": f"{nodes[hub]['label']} +{len(members) - 1}",
+        "type": "Cluster",
+        "title": f"Cluster {index}: {len(members)} entities ({breakdown})",
+        "size": min(25 + len(members) ** 0.5 * 4, 80),
+        "member_count": len(members),
+    }
+
+def summarize_graph(graph_data, expanded=(), threshold=SUMMARY_NODE_THRESHOLD):
+    """
+    Level-of-detail view of a large graph.
+    Every community is collapsed into one super-node (with entity counts) except
+    the cluster ids listed in `expanded`, whose members are shown individually.
+    Edges between collapsed clusters are aggregated into a single counted edge.
+    Graphs at or below the threshold are returned unchanged.
+    Returns (graph_data, clusters) where clusters is a list of super-node dicts for the UI.
+    """
+    nodes, edges = prepare_graph(graph_data)
+    if len(nodes) <= threshold:
+        return graph_data, []
+
+    communities = detect_communities(nodes, edges)
+    expanded = set(expanded)
+
+    degree = Counter()
+    for source, target in edges:
+        degree[source] += 1
+        degree[target] += 1
+
+    # Map every node onto what is visible for it: itself (expanded) or its cluster
+    visible_of = {}
+    visible_nodes = []
+    clusters = []
+    for index, members in enumerate(communities):
+        cluster = _cluster_node(index, members, nodes, degree)
+        clusters.append(cluster)
+        # Singletons and expanded clusters are drawn as their real nodes
+        if cluster["id"] in expanded or len(members) == 1:
+            for member in members:
+                visible_of[member] = member
+                visible_nodes.append({"id": member, "label": nodes[member]["label"], "type": nodes[member]["type"]})
+        else:
+            for member in members:
+                visible_of[member] = cluster["id"]
+            visible_nodes.append(cluster)
+
+    visible_edges = {}
+    for (source, target), labels in edges.items():
+        a, b = visible_of[source], visible_of[target]
+        # Node ids from JSON or the LLM may be ints; cluster ids are always strings
+        if a == b and str(a).startswith(CLUSTER_PREFIX):
+            continue  # Internal edge of a collapsed cluster
+        entry = visible_edges.setdefault((a, b), {"count": 0, "labels": labels})
+        entry["count"] += 1
+
+    summary_edges = []
+    for (a, b), entry in visible_edges.items():
+        aggregated = str(a).startswith(CLUSTER_PREFIX) or str(b).startswith(CLUSTER_PREFIX)
+        label = f"{entry['count']} links" if aggregated and entry["count"] > 1 else " / ".join(entry["labels"])
+        summary_edges.append({"source": a, "target": b, "label": label})
+
+    print(f"[+] Summarized {len(nodes)} nodes into {len(visible_nodes)} visible items ({len(clusters)} communities).")
+    return {"nodes": visible_nodes, "edges": summary_edges}, [c for c in clusters if c["member_count"] > 1]
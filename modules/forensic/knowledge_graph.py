@@ -0,0 +1,242 @@
+import os
+import json
+import threading
+import networkx as nx
+from modules.forensic.entity_resolution import normalize_entity_key, normalize_edge_label
+from modules.forensic.graph_query import GraphIndex
+
+# =====================================================================
+# CONFIGURATION & PATHS
+# =====================================================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+KG_DIR = os.path.join(BASE_DIR, "data", "knowledge_graph")
+KG_SNAPSHOT_PATH = os.path.join(KG_DIR, "graph_snapshot.json")
+KG_LOG_PATH = os.path.join(KG_DIR, "merge_log.jsonl")
+
+COMPACT_AFTER_MERGES = 50  # Fold the append-only merge log into the snapshot after this many merges
+DEFAULT_HOPS = 2           # suspect -> shared IP -> other suspect
+
+# How a suspect's graph was extracted; only an LLM extraction satisfies an LLM request
+METHOD_LLM = "llm"
+METHOD_RULES = "rules"
+
+def canonical_node_id(node):
+    """Type-qualified, normalized id so the same IP/org/alias from different scans collapses to one node."""
+    n_type = str(node.get("type", "Unknown")).strip().lower() or "unknown"
+    return f"{n_type}:{normalize_entity_key(node.get('id'))}"
+
+def suspect_node_id(suspect_id):
+    return f"person:{normalize_entity_key(suspect_id)}"
+
+class KnowledgeGraph:
+    """
+    Global cross-suspect entity graph.
+    Extractions are merged in incrementally and persisted as an append-only
+    merge log on top of a periodic snapshot, so nothing is ever rebuilt from scratch.
+    Every node and edge records which suspects contributed it (and each edge
+    the labels per suspect), so a re-extraction replaces that suspect's
+    previous contribution instead of piling on top of it.
+    """
+
+    def __init__(self, snapshot_path=KG_SNAPSHOT_PATH, log_path=KG_LOG_PATH):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path
+        self.graph = nx.DiGraph()
+        self.version = 0
+        self.methods = {}        # suspect_id -> METHOD_LLM / METHOD_RULES
+        self.suspect_nodes = {}  # suspect_id -> canonical ids it contributed (its edges join two of them)
+        self.pending_merges = 0
+        self.lock = threading.RLock()
+        self._index = None
+        self._load()
+
+    # -----------------------------------------------------------------
+    # Persistence
+    # -----------------------------------------------------------------
+    def _load(self):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.graph = nx.node_link_graph(snapshot["graph"], directed=True, multigraph=False)
+            self.version = snapshot.get("version", 0)
+            # Suspects from snapshots without methods count as rule-based, so an LLM scan re-extracts them once
+            self.methods = snapshot.get("methods", {})
+            for cid, attrs in self.graph.nodes(data=True):
+                attrs["suspects"] = set(attrs.get("suspects", []))
+                for suspect in attrs["suspects"]:
+                    self.suspect_nodes.setdefault(suspect, set()).add(cid)
+            for _, _, attrs in self.graph.edges(data=True):
+                labels = attrs.get("labels", {})
+                if isinstance(labels, list):
+                    # Older snapshots kept one label set for all contributing suspects
+                    labels = {suspect: labels for suspect in attrs.pop("suspects", [])}
+                attrs["labels"] = {suspect: set(values) for suspect, values in labels.items()}
+
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._apply(record["suspect_id"], record["graph_data"], record.get("method", METHOD_RULES))
+                        self.pending_merges += 1
+
+    def _serializable_graph(self):
+        data = nx.node_link_data(self.graph)
+        for node in data["nodes"]:
+            node["suspects"] = sorted(node.get("suspects", []))
+        for link in data.get("links", data.get("edges", [])):
+            link["labels"] = {suspect: sorted(values) for suspect, values in sorted(link.get("labels", {}).items())}
+        return data
+
+    def compact(self):
+        """Writes a fresh snapshot and truncates the merge log."""
+        with self.lock:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.version, "methods": self.methods, "graph": self._serializable_graph()}, f)
+            os.replace(tmp_path, self.snapshot_path)
+            open(self.log_path, 'w').close()
+            self.pending_merges = 0
+
+    # -----------------------------------------------------------------
+    # Merging
+    # -----------------------------------------------------------------
+    def _retract(self, suspect_id):
+        """Removes everything only this suspect contributed, and the suspect from shared nodes and edges."""
+        node_ids = self.suspect_nodes.pop(suspect_id, set())
+        for cid in node_ids:
+            for u, v, attrs in list(self.graph.out_edges(cid, data=True)):
+                if attrs["labels"].pop(suspect_id, None) is not None and not attrs["labels"]:
+                    self.graph.remove_edge(u, v)
+        for cid in node_ids:
+            attrs = self.graph.nodes[cid]
+            attrs["suspects"].discard(suspect_id)
+            if not attrs["suspects"]:
+                self.graph.remove_node(cid)
+
+    def _apply(self, suspect_id, graph_data, method=METHOD_LLM):
+        """
+        Replaces a suspect's contribution to the in-memory graph with a new extraction.
+        Returns the number of new nodes + edges.
+        """
+        self._retract(suspect_id)
+        self.methods[suspect_id] = method
+        added = 0
+        id_map = {}
+        suspect_cid = suspect_node_id(suspect_id)
+
+        for node in graph_data.get("nodes", []):
+            # The extractor's suspect node always maps onto the suspect's canonical id
+            if normalize_entity_key(node.get("id")) == normalize_entity_key(suspect_id):
+                cid = suspect_cid
+            else:
+                cid = canonical_node_id(node)
+            id_map[node.get("id")] = cid
+
+            if cid not in self.graph:
+                self.graph.add_node(cid, label=node.get("label", node.get("id")), type=node.get("type", "Unknown"), suspects=set())
+                added += 1
+            self.graph.nodes[cid]["suspects"].add(suspect_id)
+            self.suspect_nodes.setdefault(suspect_id, set()).add(cid)
+
+        for edge in graph_data.get("edges", []):
+            source = id_map.get(edge.get("source"))
+            target = id_map.get(edge.get("target"))
+            if not source or not target or source == target:
+                continue
+            if not self.graph.has_edge(source, target):
+                self.graph.add_edge(source, target, labels={})
+                added += 1
+            labels = self.graph.edges[source, target]["labels"].setdefault(suspect_id, set())
+            if edge.get("label"):
+                labels.add(normalize_edge_label(edge["label"]))
+
+        self.version += 1
+        return added
+
+    def merge(self, suspect_id, graph_data, method=METHOD_LLM):
+        """
+        Incrementally merges an extracted graph for a suspect and persists the change.
+        A suspect merged before has its previous nodes and edges replaced, so a
+        refresh corrects a bad extraction. method records how the graph was
+        extracted (METHOD_LLM or METHOD_RULES).
+        """
+        with self.lock:
+            added = self._apply(suspect_id, graph_data, method)
+
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"suspect_id": suspect_id, "method": method, "graph_data": graph_data}) + "\n")
+            self.pending_merges += 1
+
+            if self.pending_merges >= COMPACT_AFTER_MERGES:
+                self.compact()
+
+        print(f"[+] Knowledge graph merged {suspect_id}: {added} new nodes/edges (v{self.version}).")
+        return added
+
+    # -----------------------------------------------------------------
+    # Queries
+    # -----------------------------------------------------------------
+    def has_suspect(self, suspect_id, method=None):
+        """True if the suspect was merged, and with method given, extracted that way."""
+        with self.lock:
+            if suspect_node_id(suspect_id) not in self.graph:
+                return False
+            return method is None or self.methods.get(suspect_id) == method
+
+    def to_graph_data(self, node_ids):
+        """Converts a set of canonical node ids into the {nodes, edges} format used by graph_builder."""
+        node_ids = set(node_ids)
+        nodes = [
+            {"id": cid, "label": self.graph.nodes[cid].get("label", cid), "type": self.graph.nodes[cid].get("type", "Unknown")}
+            for cid in node_ids
+        ]
+        edges = [
+            {"source": u, "target": v, "label": " / ".join(sorted(set().union(*attrs["labels"].values())))}
+            for u, v, attrs in self.graph.subgraph(node_ids).edges(data=True)
+        ]
+        return {"nodes": nodes, "edges": edges}
+
+    def suspect_neighbourhood(self, suspect_id, hops=DEFAULT_HOPS):
+        """k-hop neighbourhood around a suspect, ignoring edge direction."""
+        with self.lock:
+            center = suspect_node_id(suspect_id)
+            if center not in self.graph:
+                return {"nodes": [], "edges": []}
+            lengths = nx.single_source_shortest_path_length(self.graph.to_undirected(as_view=True), center, cutoff=hops)
+            return self.to_graph_data(lengths.keys())
+
+    def query_index(self):
+        """
+        GraphIndex over the whole knowledge graph for path/neighbourhood queries.
+        Rebuilt lazily only when a merge has bumped the graph version.
+        """
+        with self.lock:
+            if self._index is None or self._index.version != self.version:
+                self._index = GraphIndex(self.to_graph_data(self.graph.nodes), version=self.version)
+            return self._index
+
+    def linked_suspects(self, suspect_id):
+        """Other suspects sharing at least one entity with this suspect."""
+        with self.lock:
+            center = suspect_node_id(suspect_id)
+            if center not in self.graph:
+                return set()
+            linked = set()
+            for neighbour in nx.all_neighbors(self.graph, center):
+                linked.update(self.graph.nodes[neighbour].get("suspects", set()))
+            linked.discard(suspect_id)
+            return linked
+
+_instance = None
+_instance_lock = threading.Lock()
+
+def get_knowledge_graph():
+    """Process-wide shared knowledge graph, loaded lazily on first use."""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = KnowledgeGraph()
+        return _instance
@@ -1,6 +1,16 @@
 import os
 import json
-import ollama
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from modules import llm_gateway
+from modules.forensic.entity_extractor import (
+    extract_entities,
+    build_default_edges,
+    select_relevant_sentences,
+    SENTENCE_SPLIT_RE,
+)
+from modules.forensic.stream_parser import IncrementalJSONParser
+from modules.forensic.entity_resolution import EntityResolver, merge_subgraphs, normalize_edge_label
 
 # =====================================================================
 # CONFIGURATION & PATHS
@@ -8,6 +18,11 @@ import ollama
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 JSON_PATH = os.path.join(BASE_DIR, "data", "cases", "case_records.json")
 
+# Map-reduce extraction for long dossiers
+SEGMENT_CHARS = 3000          # Target segment size sent to the LLM (well inside Llama 3.2's context)
+SEGMENT_OVERLAP_CHARS = 400   # Overlap so relationships spanning a boundary are not lost
+MAX_EXTRACTION_WORKERS = 4    # Max concurrent segment extractions against Ollama
+
 def get_suspect_metadata(suspect_id):
     """Fetches the self-contained dossier and metadata for a given suspect."""
     if not os.path.exists(JSON_PATH):
@@ -22,10 +37,125 @@ def get_suspect_metadata(suspect_id):
         
     return suspect_data
 
-def generate_graph_data(suspect_id):
+def list_suspect_ids():
+    """All suspect ids that have a dossier in the case records."""
+    if not os.path.exists(JSON_PATH):
+        return []
+    with open(JSON_PATH, 'r', encoding='utf-8') as f:
+        return sorted(json.load(f).keys())
+
+def split_dossier(text, segment_chars=SEGMENT_CHARS, overlap_chars=SEGMENT_OVERLAP_CHARS):
+    """
+    Splits a dossier into overlapping segments on sentence boundaries.
+    Short dossiers come back as a single segment.
+    """
+    if len(text) <= segment_chars:
+        return [text]
+
+    sentences = [s for s in SENTENCE_SPLIT_RE.split(text) if s.strip()]
+    segments = []
+    current = []
+    current_len = 0
+
+    for sentence in sentences:
+        if current and current_len + len(sentence) > segment_chars:
+            segments.append(" ".join(current))
+            # Carry the tail of this segment over as the overlap
+            overlap = []
+            overlap_len = 0
+            for prev in reversed(current):
+                if overlap_len + len(prev) > overlap_chars:
+                    break
+                overlap.insert(0, prev)
+                overlap_len += len(prev) + 1
+            current = overlap
+            current_len = overlap_len
+        current.append(sentence)
+        current_len += len(sentence) + 1
+
+    if current:
+        segments.append(" ".join(current))
+    return segments
+
+def stream_relationships(nodes, dossier_text, resolver=None):
+    """
+    Hands only relationship inference to Llama 3.2. The entities are already
+    known, so the prompt carries the node list plus the sentences that mention them.
+    The response is streamed and each edge is yielded as soon as its JSON closes.
+    """
+    system_prompt = """
+    You are a Cyber Forensic Relationship Extractor. You are given a fixed list of entity ids and evidence sentences.
+    Output ONLY JSON Lines: one edge object per line, e.g. {"source": "<id>", "target": "<id>", "label": "<relationship>"}
+    Use ONLY the given ids. Do not invent entities. No markdown, no commentary.
+    """
+
+    entity_lines = "\n".join(f"- {n['id']} ({n['type']})" for n in nodes)
+    evidence = select_relevant_sentences(dossier_text, nodes)
+
+    user_prompt = f"""
+    ENTITIES:
+    {entity_lines}
+
+    EVIDENCE:
+    {evidence}
+
+    The suspect is '{nodes[0]['id']}'.
     """
-    Master function: Gets the self-contained dossier from JSON, 
-    and uses Llama 3.2 to extract a structured JSON graph topology.
+
+    resolver = resolver or EntityResolver(nodes)
+    parser = IncrementalJSONParser()
+
+    stream = llm_gateway.chat(model="llama3.2", messages=[
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ], stream=True)
+
+    for chunk in stream:
+        for obj in parser.feed(chunk["message"]["content"]):
+            # Drop edges that point at entities the rule-based stage never produced
+            edge = resolver.resolve_edge(obj)
+            if edge:
+                yield edge
+
+def stream_segment_subgraphs(segments, meta, max_workers=MAX_EXTRACTION_WORKERS):
+    """
+    Map step: extracts a sub-graph from every segment in parallel with at most
+    max_workers concurrent LLM calls. Each segment gets its own rule-based
+    entities and the relationships the LLM finds between them; sub-graphs are
+    yielded as soon as their segment finishes, in completion order.
+    """
+    events = queue.Queue()
+    segment_done = object()
+
+    def worker(segment):
+        try:
+            segment_nodes = extract_entities(segment, meta)
+            if len(segment_nodes) < 2:
+                return
+            edges = list(stream_relationships(segment_nodes, segment))
+            events.put({"nodes": segment_nodes, "edges": edges})
+        except Exception as e:
+            print(f"[-] Segment extraction failed: {e}")
+        finally:
+            events.put(segment_done)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for segment in segments:
+            pool.submit(worker, segment)
+
+        remaining = len(segments)
+        while remaining:
+            item = events.get()
+            if item is segment_done:
+                remaining -= 1
+                continue
+            yield item
+
+def stream_graph_data(suspect_id, use_llm=True):
+    """
+    Streaming variant of generate_graph_data.
+    Yields ("node", dict) and ("edge", dict) events as soon as each one is known:
+    rule-based nodes arrive immediately, LLM edges as the response streams in.
     """
     print(f"[*] Starting Graph Extraction for: {suspect_id.upper()}")
     
@@ -34,68 +164,64 @@ def generate_graph_data(suspect_id):
         meta = get_suspect_metadata(suspect_id)
     except Exception as e:
         print(f"[-] {e}")
-        return {"nodes": [], "edges": []}
+        return
         
     dossier_text = meta.get("intelligence_dossier", "")
     print(f"[*] Loaded isolated intelligence dossier ({len(dossier_text)} characters).")
     
-    # 2. LLM Interrogation
-    print("[*] Interrogating Llama 3.2 for Entity and Relationship extraction...")
-    
-    system_prompt = """
-    You are an expert Cyber Forensic Data Extractor. Your task is to analyze a suspect's intelligence dossier and extract a network graph.
-    You MUST output ONLY valid JSON. Do not include markdown formatting like ```json or any conversational text.
-    
-    Extract entities as "nodes" and relationships as "edges".
-    Nodes should have: id (string), label (string), type (Person, IP, Location, Organization, Malware, Device)
-    Edges should have: source (string: matching a node id), target (string: matching a node id), label (string: relationship description)
-    
-    Structure your output exactly like this:
-    {
-      "nodes": [
-        {"id": "Philip", "label": "Philip Menon", "type": "Person"},
-        {"id": "192.168.1.1", "label": "192.168.1.1", "type": "IP"}
-      ],
-      "edges": [
-        {"source": "Philip", "target": "192.168.1.1", "label": "used IP"}
-      ]
-    }
-    """
-    
-    user_prompt = f"""
-    SUSPECT ALIASES: {meta.get('aliases')}
-    CURRENT STATUS: {meta.get('status')}
-    
-    INTELLIGENCE DOSSIER:
-    {dossier_text}
-    
-    Extract the network graph for this suspect based ONLY on the dossier text above. Ensure the suspect is the central node.
-    """
-    
+    # 2. Deterministic fast-path: regexes + gazetteer produce the nodes
+    meta = {**meta, "suspect_id": suspect_id}
+    resolver = EntityResolver(extract_entities(dossier_text, meta))
+    nodes = list(resolver.nodes.values())
+    print(f"[+] Rule-based stage extracted {len(nodes)} entities.")
+    for node in nodes:
+        yield "node", node
+
+    if not use_llm:
+        for edge in build_default_edges(nodes):
+            yield "edge", edge
+        return
+
+    # 3. LLM Interrogation (relationships only, streamed)
+    # Long dossiers are mapped over overlapping segments in parallel; the segment
+    # sub-graphs are reduced through the resolver (seeded with the full-text
+    # entities), so entities and edges repeated across overlaps collapse into one.
+    segments = split_dossier(dossier_text)
+    print(f"[*] Interrogating Llama 3.2 for Relationship extraction ({len(segments)} segment(s))...")
+    seen_edges = set()
+    edge_count = 0
     try:
-        response = ollama.chat(model="llama3.2", messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ])
-        
-        raw_output = response["message"]["content"].strip()
-        
-        # Clean up Markdown if Llama ignores instructions
-        if raw_output.startswith("```json"):
-            raw_output = raw_output[7:]
-        if raw_output.startswith("```"):
-            raw_output = raw_output[3:]
-        if raw_output.endswith("```"):
-            raw_output = raw_output[:-3]
-            
-        graph_data = json.loads(raw_output.strip())
-        print("[+] Graph structured data successfully extracted!")
-        return graph_data
-        
-    except json.JSONDecodeError as e:
-        print(f"[-] LLM Output Error: Did not return valid JSON. ({e})")
-        print(f"Raw Output was: {raw_output}")
-        return {"nodes": [], "edges": []}
+        if len(segments) == 1:
+            events = (("edge", edge) for edge in stream_relationships(nodes, dossier_text, resolver))
+        else:
+            events = merge_subgraphs(stream_segment_subgraphs(segments, meta), resolver)
+        for kind, item in events:
+            if kind == "node":
+                yield "node", item
+                continue
+            key = (item["source"], item["target"], normalize_edge_label(item["label"]))
+            if key in seen_edges:
+                continue
+            seen_edges.add(key)
+            edge_count += 1
+            yield "edge", item
     except Exception as e:
-        print(f"[-] Extraction failed: {e}")
-        return {"nodes": [], "edges": []}
\ No newline at end of file
+        print(f"[-] Relationship inference failed: {e}")
+
+    if edge_count == 0:
+        print("[!] Falling back to deterministic suspect-centred edges.")
+        for edge in build_default_edges(nodes):
+            yield "edge", edge
+
+    print("[+] Graph structured data successfully extracted!")
+
+def generate_graph_data(suspect_id, use_llm=True):
+    """
+    Master function: Gets the self-contained dossier from JSON, extracts the
+    entities deterministically, and uses Llama 3.2 only to infer relationships.
+    With use_llm=False the graph is built instantly from the rule-based stage.
+    """
+    graph_data = {"nodes": [], "edges": []}
+    for kind, item in stream_graph_data(suspect_id, use_llm=use_llm):
+        graph_data["nodes" if kind == "node" else "edges"].append(item)
+    return graph_data
@@ -1,8 +1,51 @@
 from fpdf import FPDF
+from fpdf.fonts import CoreFont
+from PIL import Image, ImageOps
 import os
+import json
+import hashlib
 import datetime
+import threading
+from collections import OrderedDict
+
+MAX_CACHED_REPORTS = 32  # Rendered PDFs kept in memory (LRU)
+
+# Subject photo as printed in the report
+PHOTO_WIDTH_MM = 50
+PHOTO_DPI = 200
+PHOTO_JPEG_QUALITY = 82
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PHOTO_CACHE_DIR = os.path.join(BASE_DIR, "data", "temp_reports", "photo_cache")
+
+# Core fonts used by the report template, in registration order
+REPORT_FONTS = (("helvetica", "B"), ("helvetica", "I"), ("helvetica", ""))
+
+_report_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_shared_fonts = None
+
+def shared_report_fonts():
+    """
+    Font objects for REPORT_FONTS, built once per process. Core fonts carry only
+    their metrics and resource index, no per-document state, so every report
+    registers these same objects instead of building its own.
+    """
+    global _shared_fonts
+    if _shared_fonts is None:
+        _shared_fonts = {
+            family + style: CoreFont(i + 1, family + style, style)
+            for i, (family, style) in enumerate(REPORT_FONTS)
+        }
+    return _shared_fonts
 
 class ForensicReport(FPDF):
+    # Fixed footer timestamp for batch exports; None means "time of rendering"
+    generated_at = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fonts.update(shared_report_fonts())
+
     def header(self):
         # Official Header
         self.set_font("helvetica", "B", 16)
@@ -18,17 +61,59 @@ class ForensicReport(FPDF):
         self.set_y(-15)
         self.set_font("helvetica", "I", 8)
         self.set_text_color(128)
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = self.generated_at or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.cell(0, 10, f"Generated: {timestamp} | Page {self.page_no()}", align="C")
 
-def generate_suspect_pdf(meta, match_score, image_path):
-    """Generates a formatted PDF report and returns the file path."""
+def file_digest(path):
+    """SHA-256 of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def prepare_report_image(image_path, digest=None):
+    """
+    Downscales and recompresses the subject photo to its printed size and DPI.
+    Full-resolution CCTV frames are several MB; the processed JPEG is a few tens
+    of KB. Results are cached on disk by content hash and reused by every report.
+    Pass the photo's file_digest() if it is already known to skip re-reading it.
+    """
+    digest = digest or file_digest(image_path)
+
+    target_px = round(PHOTO_WIDTH_MM / 25.4 * PHOTO_DPI)
+    cached_path = os.path.join(PHOTO_CACHE_DIR, f"{digest}_{target_px}.jpg")
+    if os.path.exists(cached_path):
+        return cached_path
+
+    os.makedirs(PHOTO_CACHE_DIR, exist_ok=True)
+    with Image.open(image_path) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        if img.width > target_px:
+            img = img.resize((target_px, round(img.height * target_px / img.width)), Image.LANCZOS)
+        tmp_path = f"{cached_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        img.save(tmp_path, "JPEG", quality=PHOTO_JPEG_QUALITY, optimize=True)
+    os.replace(tmp_path, cached_path)
+    return cached_path
+
+def _build_report(meta, match_score, image_path, image_digest=None):
+    """Lays out the suspect report and returns the FPDF document."""
     pdf = ForensicReport()
     pdf.add_page()
     
     # 1. Subject Photo (Placed on the left)
-    if os.path.exists(image_path):
-        pdf.image(image_path, x=15, y=35, w=50)
+    if image_path and os.path.exists(image_path):
+        try:
+            photo_path = prepare_report_image(image_path, image_digest)
+        except Image.DecompressionBombError as e:
+            # Opening the original would trip the same limit; the report goes out without the photo
+            print(f"[-] Photo rejected as oversized, omitting it from the report: {e}")
+            photo_path = None
+        except (OSError, ValueError) as e:
+            print(f"[-] Photo preprocessing failed, embedding original: {e}")
+            photo_path = image_path
+        if photo_path:
+            pdf.image(photo_path, x=15, y=35, w=PHOTO_WIDTH_MM)
     
     # 2. Basic Information (Placed next to the photo)
     pdf.set_xy(70, 35)
@@ -45,7 +130,10 @@ def generate_suspect_pdf(meta, match_score, image_path):
     pdf.cell(0, 8, f"Known Aliases: {aliases}", ln=True)
     
     pdf.set_x(70)
-    pdf.cell(0, 8, f"Biometric Match Score: {match_score:.4f} (Cosine Dist)", ln=True)
+    if match_score is None:
+        pdf.cell(0, 8, "Biometric Match Score: N/A (records export)", ln=True)
+    else:
+        pdf.cell(0, 8, f"Biometric Match Score: {match_score:.4f} (Cosine Dist)", ln=True)
 
     # 3. Move cursor below the image for the dossier
     pdf.set_y(95)
@@ -60,13 +148,53 @@ def generate_suspect_pdf(meta, match_score, image_path):
     # Multi_cell handles text wrapping automatically
     pdf.multi_cell(0, 7, dossier_text) 
     
-    # 5. Save the PDF to a temporary path
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    output_dir = os.path.join(base_dir, "data", "temp_reports")
+    return pdf
+
+def report_cache_key(meta, match_score, image_digest):
+    """Hash of everything that changes the report: metadata, score and the photo's file_digest()."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(meta, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(f"{match_score:.6f}".encode("utf-8") if match_score is not None else b"none")
+    digest.update((image_digest or "no-photo").encode("utf-8"))
+    return digest.hexdigest()
+
+def render_suspect_pdf(meta, match_score, image_path):
+    """
+    Renders the report straight to bytes, with no temp file.
+    Results are cached by (metadata, score, image) hash, so repeated
+    downloads and Streamlit reruns reuse the already-rendered PDF.
+    """
+    # The photo is hashed once, for both the cache key and the photo cache
+    image_digest = file_digest(image_path) if image_path and os.path.exists(image_path) else None
+    key = report_cache_key(meta, match_score, image_digest)
+    with _cache_lock:
+        if key in _report_cache:
+            _report_cache.move_to_end(key)
+            return _report_cache[key]
+
+    pdf_bytes = bytes(_build_report(meta, match_score, image_path, image_digest).output())
+
+    with _cache_lock:
+        _report_cache[key] = pdf_bytes
+        if len(_report_cache) > MAX_CACHED_REPORTS:
+            _report_cache.popitem(last=False)
+    return pdf_bytes
+
+def generate_suspect_pdf(meta, match_score, image_path):
+    """
+    Generates a formatted PDF report and returns the file path.
+    The file name carries the report hash, so concurrent sessions never write the same file.
+    """
+    pdf_bytes = render_suspect_pdf(meta, match_score, image_path)
+    
+    output_dir = os.path.join(BASE_DIR, "data", "temp_reports")
     os.makedirs(output_dir, exist_ok=True)
     
-    filename = f"{meta.get('full_name', 'Suspect').replace(' ', '_')}_Report.pdf"
+    digest = hashlib.sha256(pdf_bytes).hexdigest()[:12]
+    filename = f"{meta.get('full_name', 'Suspect').replace(' ', '_')}_{digest}_Report.pdf"
     output_path = os.path.join(output_dir, filename)
     
-    pdf.output(output_path)
-    return output_path
\ No newline at end of file
+    if not os.path.exists(output_path):
+        with open(output_path, "wb") as f:
+            f.write(pdf_bytes)
+    return output_path
@@ -0,0 +1,54 @@
+import json
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for streamed LLM output.
+    Feed it raw text chunks as they arrive; it returns every JSON object that
+    has been fully closed so far. Works for JSONL (one object per line) as well
+    as a single wrapping document like {"edges": [{...}, {...}]}, where the
+    inner objects are emitted as soon as their closing brace arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.in_string = False
+        self.escaped = False
+        self.open_braces = []  # buffer offsets of currently open '{'
+
+    def feed(self, chunk):
+        """Consumes a text chunk and returns a list of completed JSON objects (dicts)."""
+        self.buffer += chunk
+        completed = []
+
+        while self.pos < len(self.buffer):
+            ch = self.buffer[self.pos]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.open_braces.append(self.pos)
+            elif ch == "}" and self.open_braces:
+                start = self.open_braces.pop()
+                try:
+                    obj = json.loads(self.buffer[start:self.pos + 1])
+                    if isinstance(obj, dict):
+                        completed.append(obj)
+                except json.JSONDecodeError:
+                    pass
+
+            self.pos += 1
+
+        # Nothing open: everything scanned so far can be dropped
+        if not self.open_braces and not self.in_string:
+            self.buffer = ""
+            self.pos = 0
+
+        return completed
@@ -0,0 +1,167 @@
+# ============================================================
+# LLM GATEWAY (Shared Ollama Access)
+# One pooled client for every module that talks to Ollama,
+# with per-model concurrency limits, keep_alive and metrics.
+# ============================================================
+
+import os
+import time
+import threading
+import httpx
+import ollama
+from langchain_core.embeddings import Embeddings
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")
+REQUEST_TIMEOUT = 300  # Seconds; long generations on CPU-only boxes are slow
+
+# How long Ollama keeps a model resident after the last request.
+# Long enough that investigators working in bursts never pay a reload.
+DEFAULT_KEEP_ALIVE = os.environ.get("EVOFORENSIC_KEEP_ALIVE", "30m")
+MODEL_KEEP_ALIVE = {}
+
+# Max concurrent requests per model; extra callers queue inside the gateway
+# instead of piling onto the Ollama server.
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get("EVOFORENSIC_MAX_IN_FLIGHT", "2"))
+MODEL_MAX_IN_FLIGHT = {
+    "mxbai-embed-large": 4,
+}
+
+# Models loaded when the app starts, so the first scan or question never pays the load
+PRELOAD_MODELS = [m for m in os.environ.get("EVOFORENSIC_PRELOAD", "llama3.2,mxbai-embed-large").split(",") if m]
+EMBEDDING_MODELS = {"mxbai-embed-large"}  # Loaded through /api/embed; they cannot generate
+
+POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+
+# =====================================================================
+# SHARED STATE
+# =====================================================================
+_client = ollama.Client(host=OLLAMA_HOST, timeout=REQUEST_TIMEOUT, limits=POOL_LIMITS)
+_lock = threading.Lock()
+_slots = {}
+_metrics = {}
+
+def _get_slot(model):
+    with _lock:
+        if model not in _slots:
+            _slots[model] = threading.BoundedSemaphore(MODEL_MAX_IN_FLIGHT.get(model, DEFAULT_MAX_IN_FLIGHT))
+            _metrics[model] = {
+                "in_flight": 0,
+                "queued": 0,
+                "max_queued": 0,
+                "requests": 0,
+                "errors": 0,
+                "total_wait_s": 0.0,
+            }
+        return _slots[model]
+
+def _acquire(model):
+    slot = _get_slot(model)
+    stats = _metrics[model]
+    with _lock:
+        stats["queued"] += 1
+        stats["max_queued"] = max(stats["max_queued"], stats["queued"])
+
+    started = time.monotonic()
+    slot.acquire()
+
+    with _lock:
+        stats["queued"] -= 1
+        stats["in_flight"] += 1
+        stats["requests"] += 1
+        stats["total_wait_s"] += time.monotonic() - started
+
+def _release(model, failed=False):
+    with _lock:
+        _metrics[model]["in_flight"] -= 1
+        if failed:
+            _metrics[model]["errors"] += 1
+    _slots[model].release()
+
+def keep_alive_for(model):
+    return MODEL_KEEP_ALIVE.get(model, DEFAULT_KEEP_ALIVE)
+
+def get_metrics():
+    """Snapshot of queue depth and throughput counters per model."""
+    with _lock:
+        return {model: dict(stats) for model, stats in _metrics.items()}
+
+# =====================================================================
+# PUBLIC API
+# =====================================================================
+def chat(model, messages, stream=False, **kwargs):
+    """
+    Drop-in replacement for ollama.chat that goes through the shared pool.
+    For streamed calls the concurrency slot is held until the stream is exhausted or closed.
+    """
+    kwargs.setdefault("keep_alive", keep_alive_for(model))
+
+    if not stream:
+        _acquire(model)
+        try:
+            response = _client.chat(model=model, messages=messages, **kwargs)
+        except Exception:
+            _release(model, failed=True)
+            raise
+        _release(model)
+        return response
+
+    return _stream_chat(model, messages, **kwargs)
+
+def _stream_chat(model, messages, **kwargs):
+    _acquire(model)
+    failed = False
+    try:
+        for chunk in _client.chat(model=model, messages=messages, stream=True, **kwargs):
+            yield chunk
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _release(model, failed=failed)
+
+def embed(model, inputs):
+    """Embeds a list of strings and returns a list of vectors."""
+    _acquire(model)
+    try:
+        response = _client.embed(model=model, input=inputs, keep_alive=keep_alive_for(model))
+    except Exception:
+        _release(model, failed=True)
+        raise
+    _release(model)
+    return response["embeddings"]
+
+def preload(model):
+    """Loads a model into memory ahead of the first real request (counted against its concurrency cap)."""
+    _acquire(model)
+    try:
+        if model in EMBEDDING_MODELS:
+            _client.embed(model=model, keep_alive=keep_alive_for(model))
+        else:
+            _client.generate(model=model, prompt="", keep_alive=keep_alive_for(model))
+    except Exception as e:
+        _release(model, failed=True)
+        print(f"[-] Failed to preload {model}: {e}")
+        return
+    _release(model)
+    print(f"[+] Model preloaded: {model}")
+
+def preload_all(models=PRELOAD_MODELS):
+    """Preloads models on a background thread so app start-up is never blocked on Ollama."""
+    thread = threading.Thread(target=lambda: [preload(m) for m in models], name="llm-preload", daemon=True)
+    thread.start()
+    return thread
+
+class GatewayEmbeddings(Embeddings):
+    """LangChain embeddings adapter so vector stores share the gateway's pool and limits."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def embed_documents(self, texts):
+        return embed(self.model, list(texts))
+
+    def embed_query(self, text):
+        return embed(self.model, [text])[0]
@@ -0,0 +1,183 @@
+import os
+import re
+import json
+import hashlib
+import time
+import sqlite3
+import threading
+import numpy as np
+from modules.research.retrieval import query_identifiers
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+SIMILARITY_THRESHOLD = float(os.environ.get("EVOFORENSIC_ANSWER_SIMILARITY", 0.95))
+MAX_ANSWERS_PER_CORPUS = 500
+STREAM_WORDS_PER_PIECE = 3  # Cached answers are replayed in small pieces so the UI still streams
+
+_NORMALIZE_RE = re.compile(r"[^\w.\-@:/]+")
+_DIGITS_RE = re.compile(r"\d+")
+
+def normalize_query(query):
+    """Lowercased question with punctuation and spacing differences removed."""
+    return " ".join(_NORMALIZE_RE.sub(" ", query.lower()).split()).strip(" .")
+
+def conversation_key(query, target_cases, history_text):
+    """
+    "" for a question that stands on its own: the first of a conversation, or
+    one that names its cases or identifiers itself ("and the verdict in case 7?").
+    Any other follow-up ("And the sentence?") is keyed by a hash of the packed
+    history it was answered with, so it only matches the same conversation.
+    """
+    if not history_text or target_cases or query_identifiers(query):
+        return ""
+    return hashlib.sha256(history_text.encode("utf-8")).hexdigest()[:16]
+
+def query_signature(query, target_cases=(), context=""):
+    """
+    What a near-duplicate must share exactly: the cases it targets, every
+    number or identifier it names, so "verdict in case 7" never matches "case 8",
+    and its conversation_key.
+    """
+    numbers = sorted(set(_DIGITS_RE.findall(query)))
+    identifiers = sorted(query_identifiers(query))
+    return "|".join([",".join(sorted(map(str, target_cases))), ",".join(numbers), ",".join(identifiers), context])
+
+def replay(text, words_per_piece=STREAM_WORDS_PER_PIECE):
+    """Yields a stored answer in small pieces, mimicking a live token stream."""
+    words = text.split(" ")
+    for i in range(0, len(words), words_per_piece):
+        piece = " ".join(words[i:i + words_per_piece])
+        yield piece + (" " if i + words_per_piece < len(words) else "")
+
+class AnswerCache:
+    """
+    Per-corpus store of generated answers with their citations.
+    A corpus never changes once built, so its key is the version: entries stay
+    valid until the corpus is deleted. Lookups try the normalized query first,
+    then the most similar cached question (cosine similarity of query embeddings)
+    with the same signature, above SIMILARITY_THRESHOLD.
+    """
+
+    def __init__(self, path, max_entries=MAX_ANSWERS_PER_CORPUS):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model TEXT,
+                query TEXT,
+                normalized TEXT,
+                signature TEXT,
+                answer TEXT,
+                citations TEXT,
+                embedding BLOB,
+                created REAL,
+                last_used REAL,
+                hits INTEGER DEFAULT 0
+            )
+        """)
+        # The same words asked mid-conversation are a different question (see conversation_key)
+        self.conn.execute("DROP INDEX IF EXISTS idx_answers_query")
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_answers_key ON answers(model, normalized, signature)")
+        self.conn.commit()
+        self._matrix = None  # (ids, normalized embedding matrix, signatures), rebuilt after writes
+
+    def _entry(self, row):
+        entry_id, query, answer, citations = row
+        now = time.time()
+        self.conn.execute("UPDATE answers SET hits = hits + 1, last_used = ? WHERE id = ?", (now, entry_id))
+        self.conn.commit()
+        return {"id": entry_id, "query": query, "answer": answer, "citations": json.loads(citations)}
+
+    def lookup_exact(self, model, query, signature):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, query, answer, citations FROM answers WHERE model = ? AND normalized = ? AND signature = ?",
+                (model, normalize_query(query), signature),
+            ).fetchone()
+            return self._entry(row) if row else None
+
+    def lookup_similar(self, model, vector, signature, threshold=SIMILARITY_THRESHOLD):
+        """Most similar cached answer with the same signature, or None. Adds entry['similarity']."""
+        with self.lock:
+            if self._matrix is None:
+                rows = self.conn.execute(
+                    "SELECT id, embedding, signature FROM answers WHERE model = ? AND embedding IS NOT NULL", (model,)
+                ).fetchall()
+                if not rows:
+                    return None
+                matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob, _ in rows])
+                matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-9)
+                self._matrix = ([r[0] for r in rows], matrix, [r[2] for r in rows])
+            ids, matrix, signatures = self._matrix
+
+            query_vec = np.asarray(vector, dtype=np.float32)
+            if query_vec.shape[0] != matrix.shape[1]:
+                return None
+            similarities = matrix @ (query_vec / max(np.linalg.norm(query_vec), 1e-9))
+            for i in np.argsort(-similarities):
+                if similarities[i] < threshold:
+                    return None
+                if signatures[i] == signature:
+                    row = self.conn.execute(
+                        "SELECT id, query, answer, citations FROM answers WHERE id = ?", (ids[i],)
+                    ).fetchone()
+                    entry = self._entry(row)
+                    entry["similarity"] = float(similarities[i])
+                    return entry
+            return None
+
+    def store(self, model, query, signature, answer, citations, vector=None):
+        blob = np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO answers
+                   (model, query, normalized, signature, answer, citations, embedding, created, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (model, query, normalize_query(query), signature, answer, json.dumps(citations), blob, now, now),
+            )
+            # Keep the most recently used answers only
+            self.conn.execute(
+                "DELETE FROM answers WHERE id NOT IN (SELECT id FROM answers ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self.conn.commit()
+            self._matrix = None
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# =====================================================================
+# CITATIONS
+# =====================================================================
+def cite(docs, chunk_ids):
+    """
+    Citations for the chunks an answer was generated from, one per case in order:
+    [{"case_number", "case_id", "chunks"}]. Stored with the answer so a cached
+    reply names the same evidence as the original.
+    """
+    metadata = {d.metadata["chunk"]: d.metadata for d in docs}
+    cases = {}
+    for chunk in chunk_ids:
+        meta = metadata.get(chunk, {})
+        case_number = meta.get("case_number", "general")
+        entry = cases.setdefault(case_number, {"case_number": case_number, "case_id": meta.get("case_id"), "chunks": []})
+        entry["chunks"].append(chunk)
+    return list(cases.values())
+
+def format_sources(citations):
+    """Footer streamed after every answer, e.g. "Sources: Case 14 (CF-2023-005), Case 3"."""
+    labels = []
+    for citation in citations:
+        if citation["case_number"] == "general":
+            labels.append("General notes")
+        elif citation.get("case_id"):
+            labels.append(f"Case {citation['case_number']} ({citation['case_id']})")
+        else:
+            labels.append(f"Case {citation['case_number']}")
+    return f"\n\n📎 Sources: {', '.join(labels)}" if labels else ""
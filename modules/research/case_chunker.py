@@ -0,0 +1,173 @@
+import io
+import re
+from langchain_core.documents import Document
+from modules.research.case_index import extract_case_fields
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+CASE_SPLIT_RE = re.compile(r"(?=⭐\s*CASE FILE)")
+CASE_NUMBER_RE = re.compile(r"CASE FILE\s+(\d+)", re.IGNORECASE)
+# A line that is only a heading: "Evidence Extracts:", "Investigation Notes:", "Logs Extract:"
+HEADING_RE = re.compile(r"^\s*([A-Z][\w /&(),'-]{1,60}?)\s*:\s*$")
+OVERVIEW_SECTIONS = {"summary"}  # Folded into the header so the overview chunk reads as one unit
+
+TARGET_CHUNK_CHARS = 1000  # Whole sections are packed into a chunk up to this size
+MAX_CHUNK_CHARS = 1500     # Only sections longer than this are split (at line boundaries, into target-sized pieces)
+
+CHUNK_PARAMS = {"splitter": "case-sections", "target_chars": TARGET_CHUNK_CHARS, "max_chars": MAX_CHUNK_CHARS}
+
+# Streaming: the source is read in READ_CHARS pieces and a case block is never
+# held in memory beyond MAX_BLOCK_CHARS (larger blocks are chunked piece by piece)
+READ_CHARS = 1 << 20
+MAX_BLOCK_CHARS = 1 << 22
+MARKER_GUARD_CHARS = 64   # Tail kept back so a "⭐ CASE FILE" marker split across reads is still found
+HEADER_SCAN_CHARS = 4000  # Header fields sit at the top of a case block
+
+# =====================================================================
+# PARSING
+# =====================================================================
+def split_case_blocks(text):
+    """Splits a document whenever it sees "⭐ CASE FILE", keeping the marker with its case."""
+    return [block for block in CASE_SPLIT_RE.split(text) if block.strip()]
+
+def case_number_of(block):
+    match = CASE_NUMBER_RE.search(block)
+    return match.group(1) if match else "general"
+
+def iter_case_blocks(stream, read_chars=READ_CHARS, max_block_chars=MAX_BLOCK_CHARS):
+    """
+    Reads a text stream incrementally and yields (block, continued) pairs.
+    Blocks start at "⭐ CASE FILE" markers, including markers that straddle two reads.
+    A block longer than max_block_chars is flushed in pieces cut at line
+    boundaries; continued=True marks a piece that carries on the previous block.
+    Memory stays bounded by max_block_chars + read_chars whatever the file size.
+    """
+    buffer = ""
+    scan_from = 0
+    continued = False
+    while True:
+        data = stream.read(read_chars)
+        buffer += data
+
+        # Every marker after position 0 closes the block before it
+        pos = 0
+        for match in CASE_SPLIT_RE.finditer(buffer, scan_from):
+            if match.start() > pos:
+                yield buffer[pos:match.start()], continued
+                continued = False
+                pos = match.start()
+        buffer = buffer[pos:]
+        if not data:
+            break
+        scan_from = max(len(buffer) - MARKER_GUARD_CHARS, 1)
+
+        if len(buffer) > max_block_chars:
+            limit = len(buffer) - MARKER_GUARD_CHARS
+            cut = buffer.rfind("\n", 0, limit) + 1 or limit
+            yield buffer[:cut], continued
+            continued = True
+            buffer = buffer[cut:]
+            scan_from = max(len(buffer) - MARKER_GUARD_CHARS, 1)
+
+    if buffer.strip():
+        yield buffer, continued
+
+def parse_sections(block, first_section="Overview"):
+    """
+    [(section_name, text)] for one case block. Everything before the first
+    heading (title line and header fields) plus the Summary forms "Overview".
+    Blank lines are dropped; they carry no evidence and cost tokens.
+    """
+    sections = [[first_section, []]]
+    for line in block.splitlines():
+        line = line.rstrip()
+        if not line.strip():
+            continue
+        match = HEADING_RE.match(line)
+        if match and not (sections[-1][0] == "Overview" and match.group(1).lower() in OVERVIEW_SECTIONS):
+            sections.append([match.group(1).strip(), []])
+        sections[-1][1].append(line)
+    return [(name, "\n".join(lines)) for name, lines in sections if lines]
+
+def _split_long(text, max_chars):
+    """Splits an oversized section at line boundaries (hard-wrapping single huge lines)."""
+    pieces, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + 1 + len(line) > max_chars:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+# =====================================================================
+# CHUNKING
+# =====================================================================
+def chunk_case_block(block, first_chunk_index=0, fields=None, case_number=None, continued=False):
+    """
+    Section-aligned chunks of one case block, with no overlap.
+    Consecutive sections are packed into one chunk up to TARGET_CHUNK_CHARS, so a
+    short case stays a single chunk, and a section is never cut unless it alone
+    exceeds MAX_CHUNK_CHARS. Every chunk carries the case's header fields as metadata.
+    continued=True chunks a later piece of a block too large to hold at once.
+    Returns a list of Documents with consecutive metadata["chunk"] ids.
+    """
+    case_number = case_number or case_number_of(block)
+    fields = fields if fields is not None else extract_case_fields(block[:HEADER_SCAN_CHARS])
+
+    pieces = []
+    for name, text in parse_sections(block, "Continued" if continued else "Overview"):
+        for piece in (_split_long(text, TARGET_CHUNK_CHARS) if len(text) > MAX_CHUNK_CHARS else [text]):
+            pieces.append((name, piece))
+
+    groups = []
+    for name, piece in pieces:
+        if groups and groups[-1]["chars"] + len(piece) + 1 <= TARGET_CHUNK_CHARS:
+            groups[-1]["texts"].append(piece)
+            groups[-1]["chars"] += len(piece) + 1
+            if name not in groups[-1]["sections"]:
+                groups[-1]["sections"].append(name)
+        else:
+            groups.append({"sections": [name], "texts": [piece], "chars": len(piece)})
+
+    docs = []
+    for i, group in enumerate(groups):
+        body = "\n".join(group["texts"])
+        sections = ", ".join(group["sections"])
+        # Continuation chunks name their Case ID so they still make sense on their own
+        case_id = fields.get("case_id") if i > 0 or continued else None
+        heading = f"CASE {case_number} EVIDENCE ({case_id}):" if case_id else f"CASE {case_number} EVIDENCE:"
+        meta = {"chunk": first_chunk_index + i, "case_number": case_number, "sections": sections}
+        meta.update(fields)
+        docs.append(Document(page_content=f"{heading}\n{body}", metadata=meta))
+    return docs
+
+def iter_chunks(stream):
+    """
+    Streams Documents for a text stream (file object or io.StringIO) in document
+    order, holding at most one case block (or one bounded piece of it) in memory.
+    """
+    next_index = 0
+    case_number, fields = "general", {}
+    for block, continued in iter_case_blocks(stream):
+        if not block.strip():
+            continue
+        if not continued:
+            case_number = case_number_of(block[:HEADER_SCAN_CHARS])
+            fields = extract_case_fields(block[:HEADER_SCAN_CHARS])
+        docs = chunk_case_block(block, next_index, fields=fields, case_number=case_number, continued=continued)
+        next_index += len(docs)
+        yield from docs
+
+def chunk_document(text):
+    """Chunks a whole case-file document held in memory; chunk ids run in document order."""
+    return list(iter_chunks(io.StringIO(text)))
@@ -0,0 +1,59 @@
+import re
+
+# =====================================================================
+# CASE-FILE FIELDS
+# =====================================================================
+# Looks for "case 18", "case file 18", "case #18", and lists such as "cases 3, 5 and 7"
+CASE_NUMBER_QUERY_RE = re.compile(
+    r"case(?:s|\s*(?:files?|id|#))?\s*#?(\d+(?:\s*(?:,|&|and|or)\s*#?\d+)*)", re.IGNORECASE
+)
+CASE_ID_RE = re.compile(r"\b[a-z]{2,4}-\d{4}-\d{3,}\b", re.IGNORECASE)  # CF-2025-001
+
+FIELD_PATTERNS = {
+    "case_id": re.compile(r"^\s*Case ID\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+    "type": re.compile(r"^\s*Type\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+    # The organization a case is about is labelled differently from file to file
+    "company": re.compile(r"^\s*(?:Company|Organi[sz]ation|Victim|Target)\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+    "year": re.compile(r"^\s*Year\s*:\s*(\d{4})\b", re.IGNORECASE | re.MULTILINE),
+    "title": re.compile(r"CASE FILE\s+\d+\s*[—–-]+\s*[“\"]([^”\"]+)[”\"]", re.IGNORECASE),
+}
+FIELDS = tuple(FIELD_PATTERNS)
+MIN_NAME_MATCH_CHARS = 4  # Company/title names shorter than this are too ambiguous to route on
+
+def extract_case_fields(text):
+    """Structured header fields found in a case-file text: {field: value}."""
+    fields = {}
+    for field, pattern in FIELD_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            fields[field] = match.group(1).strip()
+    return fields
+
+def _normalize(text):
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+def route_query(message, index):
+    """
+    Case numbers a question is explicitly about, in the order they are named:
+    by case number ("case 14"), by Case ID ("CF-2025-001"), or by the full company
+    or operation name in the case header ("Norbitex Cloud Solutions", "Operation ShadowKey").
+    Returns [] for questions that are not case-specific.
+    """
+    numbers = [n for match in CASE_NUMBER_QUERY_RE.findall(message) for n in re.findall(r"\d+", match)]
+    if numbers:
+        return list(dict.fromkeys(numbers))
+
+    cases = []
+    for case_id in CASE_ID_RE.findall(message):
+        cases.extend(index.find_cases(case_id=case_id))
+    if cases:
+        return list(dict.fromkeys(cases))
+
+    query = f" {_normalize(message)} "
+    for row in index.case_table():
+        for field in ("company", "title"):
+            name = _normalize(row.get(field) or "")
+            if len(name) >= MIN_NAME_MATCH_CHARS and f" {name} " in query:
+                cases.append(row["case_number"])
+                break
+    return list(dict.fromkeys(cases))
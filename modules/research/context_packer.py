@@ -0,0 +1,176 @@
+import os
+import re
+from modules.research.lexical_index import analyze, STOPWORDS
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("EVOFORENSIC_CONTEXT_TOKENS", 1500))
+HISTORY_TOKEN_BUDGET = int(os.environ.get("EVOFORENSIC_HISTORY_TOKENS", 300))
+HISTORY_TURNS = 3            # Most recent turns considered for the prompt
+MIN_TRUNCATED_TOKENS = 80    # A passage cut shorter than this is dropped instead
+MAX_OVERLAP_CHARS = 400      # Longest suffix/prefix overlap searched between adjacent chunks
+MIN_DUPLICATE_LINE_CHARS = 20
+PASSAGE_SEPARATOR = "\n----------------\n"
+
+# Rough Llama-3 BPE estimate: short words are one token, long words and digit runs split
+_TOKEN_PIECE_RE = re.compile(r"[A-Za-z]{1,8}|\d{1,3}|[^\sA-Za-z\d]")
+_CHUNK_HEADING_RE = re.compile(r"^CASE \S+ EVIDENCE[^\n]*:\n")
+
+def estimate_tokens(text):
+    """Approximate prompt tokens for text, without loading the model's tokenizer."""
+    return len(_TOKEN_PIECE_RE.findall(text))
+
+# =====================================================================
+# DEDUPLICATION
+# =====================================================================
+def _overlap(left, right, max_chars=MAX_OVERLAP_CHARS):
+    """Length of the longest suffix of left that is also a prefix of right."""
+    for size in range(min(len(left), len(right), max_chars), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+def merge_adjacent(docs):
+    """
+    Passages in document order, with chunks that follow each other in the
+    document joined into one passage and the text they share removed once.
+    Returns [{"chunks": [ids], "text": str, "rank": best retrieval rank}].
+    """
+    ranked = {d.metadata["chunk"]: rank for rank, d in enumerate(docs)}
+    passages = []
+    for doc in sorted(docs, key=lambda d: d.metadata["chunk"]):
+        chunk = doc.metadata["chunk"]
+        text = doc.page_content
+        previous = passages[-1] if passages else None
+        if previous and previous["chunks"][-1] == chunk - 1 and previous["case"] == doc.metadata.get("case_number"):
+            body = _CHUNK_HEADING_RE.sub("", text, count=1)
+            body = body[_overlap(previous["text"], body):]
+            previous["text"] = f"{previous['text']}\n{body.lstrip(chr(10))}" if body else previous["text"]
+            previous["chunks"].append(chunk)
+            previous["rank"] = min(previous["rank"], ranked[chunk])
+        else:
+            passages.append({"chunks": [chunk], "case": doc.metadata.get("case_number"),
+                             "text": text, "rank": ranked[chunk]})
+    return passages
+
+def case_passages(docs):
+    """
+    One passage per chunk of a whole-case lookup, in document order. With no
+    retrieval rank to go by, a chunk's rank is its distance from the nearer end
+    of its case: the header (Case ID, type) and the closing findings or verdict
+    outrank the middle sections when the question does not single any out.
+    """
+    by_case = {}
+    for doc in sorted(docs, key=lambda d: d.metadata["chunk"]):
+        by_case.setdefault(doc.metadata.get("case_number"), []).append(doc)
+    passages = []
+    for case, case_docs in by_case.items():
+        for i, doc in enumerate(case_docs):
+            passages.append({"chunks": [doc.metadata["chunk"]], "case": case,
+                             "text": doc.page_content, "rank": min(i, len(case_docs) - 1 - i)})
+    passages.sort(key=lambda p: p["chunks"][0])
+    return passages
+
+def _drop_repeated_lines(passages):
+    """Removes long lines (boilerplate, quoted evidence) already present in an earlier passage."""
+    seen = set()
+    for passage in passages:
+        kept = []
+        for line in passage["text"].split("\n"):
+            key = line.strip()
+            if len(key) >= MIN_DUPLICATE_LINE_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        passage["text"] = "\n".join(kept)
+
+# =====================================================================
+# PACKING
+# =====================================================================
+def _score(passage, query_terms):
+    """Retrieval rank prior plus the share of query terms the passage contains."""
+    prior = 1.0 / (1 + passage["rank"])
+    if not query_terms:
+        return prior
+    terms = set(analyze(passage["text"]))
+    return prior + len(query_terms & terms) / len(query_terms)
+
+def _truncate(text, max_tokens):
+    """Keeps whole lines of text up to max_tokens, then as many words of the next line as fit."""
+    kept, used = [], 0
+    for line in text.split("\n"):
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            words = []
+            for word in line.split(" "):
+                used += estimate_tokens(word)
+                if used >= max_tokens:
+                    break
+                words.append(word)
+            if words:
+                kept.append(" ".join(words) + " …")
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+def pack_context(docs, query, budget=CONTEXT_TOKEN_BUDGET, preserve_order=False):
+    """
+    Builds the evidence section of the prompt within a token budget.
+    Adjacent chunks are merged without their overlap and repeated lines are
+    dropped; passages are then admitted best score first until the budget is
+    full, the last one truncated at a line boundary if it is worth it.
+    With preserve_order set (a whole-case lookup) every chunk stays its own
+    passage (see case_passages), so a long case loses its least relevant
+    sections rather than its last ones.
+    The admitted passages are emitted in document order.
+    Returns (context_text, stats).
+    """
+    passages = case_passages(docs) if preserve_order else merge_adjacent(docs)
+    _drop_repeated_lines(passages)
+
+    query_terms = {t for t in analyze(query) if t not in STOPWORDS}
+    candidates = sorted(passages, key=lambda p: _score(p, query_terms), reverse=True)
+
+    separator_cost = estimate_tokens(PASSAGE_SEPARATOR)
+    admitted, used, truncated = [], 0, 0
+    for passage in candidates:
+        cost = estimate_tokens(passage["text"]) + separator_cost
+        remaining = budget - used
+        if cost > remaining:
+            if remaining - separator_cost < MIN_TRUNCATED_TOKENS:
+                continue
+            passage = dict(passage, text=_truncate(passage["text"], remaining - separator_cost))
+            cost = estimate_tokens(passage["text"]) + separator_cost
+            truncated += 1
+        admitted.append(passage)
+        used += cost
+
+    admitted.sort(key=lambda p: p["chunks"][0])
+    context = PASSAGE_SEPARATOR.join(p["text"] for p in admitted)
+    stats = {
+        "retrieved_chunks": len(docs),
+        "passages": len(admitted),
+        "dropped_passages": len(passages) - len(admitted),
+        "truncated_passages": truncated,
+        "context_tokens": estimate_tokens(context),
+        "cited_chunks": [c for p in admitted for c in p["chunks"]],
+    }
+    return context, stats
+
+def pack_history(history, budget=HISTORY_TOKEN_BUDGET, turns=HISTORY_TURNS):
+    """The most recent turns that fit the budget, newest kept first, returned oldest first."""
+    kept, used = [], 0
+    for role, msg in reversed(history[-turns:]):
+        line = f"{role.upper()}: {msg}"
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            line = _truncate(line, budget - used)
+            if estimate_tokens(line) < MIN_TRUNCATED_TOKENS // 2:
+                break
+            cost = estimate_tokens(line) + 1
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept))
@@ -0,0 +1,362 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import hashlib
+import threading
+from collections import OrderedDict
+import chromadb
+from chromadb.config import Settings
+from langchain_chroma import Chroma
+from modules.research.ingestion import embed_and_insert
+from modules.research.lexical_index import LexicalIndex
+from modules.research.answer_cache import AnswerCache
+
+# =====================================================================
+# CONFIGURATION & PATHS
+# =====================================================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CORPORA_DIR = os.path.join(BASE_DIR, "data", "research_corpora")
+CHROMA_DIR = os.path.join(CORPORA_DIR, "chroma")
+MANIFEST_NAME = "manifest.json"
+LEXICAL_INDEX_NAME = "lexical.db"
+ANSWER_CACHE_NAME = "answers.db"
+CORPUS_FORMAT = 3  # Bumped whenever a corpus gains a new index; older corpora are rebuilt
+
+SESSION_IDLE_TTL_SECONDS = int(os.environ.get("EVOFORENSIC_SESSION_TTL", 30 * 60))
+MAX_OPEN_CHUNKS = int(os.environ.get("EVOFORENSIC_MAX_OPEN_CHUNKS", 200_000))     # Chunks held open across all sessions
+EVICT_IDLE_SECONDS = int(os.environ.get("EVOFORENSIC_EVICT_IDLE", 5 * 60))  # Sessions idle this long may lose their corpus to the cap
+MAX_STORED_CHUNKS = int(os.environ.get("EVOFORENSIC_MAX_STORED_CHUNKS", 2_000_000))  # Chunks kept on disk
+CHROMA_MEMORY_LIMIT_BYTES = int(os.environ.get("EVOFORENSIC_CHROMA_MEMORY", 2 * 1024 ** 3))
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    One persistent Chroma client for all corpora. Its segment cache is LRU with
+    a memory limit, so loaded vector indexes stay bounded however many corpora exist.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            os.makedirs(CHROMA_DIR, exist_ok=True)
+            _client = chromadb.PersistentClient(
+                path=CHROMA_DIR,
+                settings=Settings(
+                    anonymized_telemetry=False,
+                    chroma_segment_cache_policy="LRU",
+                    chroma_memory_limit_bytes=CHROMA_MEMORY_LIMIT_BYTES,
+                ),
+            )
+        return _client
+
+# =====================================================================
+# CORPUS KEYS
+# =====================================================================
+HASH_READ_BYTES = 1 << 20
+
+def content_hash(text):
+    """SHA-256 of the document text, independent of the uploaded file name."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def content_hash_stream(binary_file):
+    """
+    Same hash as content_hash() for a UTF-8 file, computed in one streaming pass.
+    Returns (hexdigest, num_bytes) and rewinds the file for ingestion.
+    """
+    digest = hashlib.sha256()
+    num_bytes = 0
+    binary_file.seek(0)
+    while True:
+        data = binary_file.read(HASH_READ_BYTES)
+        if not data:
+            break
+        digest.update(data)
+        num_bytes += len(data)
+    binary_file.seek(0)
+    return digest.hexdigest(), num_bytes
+
+def corpus_key(doc_hash, embedding_model, chunk_params):
+    """
+    Identity of an index: the same document embedded with the same model and
+    chunked the same way always maps to the same collection.
+    Changing any of them (e.g. a new chunk size) produces a fresh corpus.
+    """
+    identity = json.dumps(
+        {"document": doc_hash, "model": embedding_model, "chunking": chunk_params, "format": CORPUS_FORMAT},
+        sort_keys=True,
+    )
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:24]
+
+def corpus_dir(key):
+    return os.path.join(CORPORA_DIR, key)
+
+def collection_name(key):
+    """Every corpus gets its own collection, so uploads never share result sets."""
+    return f"corpus_{key}"
+
+# =====================================================================
+# PERSISTENCE
+# =====================================================================
+class Corpus:
+    """
+    An opened corpus: its manifest, the vector store attached to its collection,
+    its BM25 index and the answers already generated from it.
+    """
+
+    def __init__(self, key, manifest, vectordb, lexical, answers):
+        self.key = key
+        self.manifest = manifest
+        self.vectordb = vectordb
+        self.lexical = lexical
+        self.answers = answers
+
+    @property
+    def num_chunks(self):
+        return self.manifest["num_chunks"]
+
+    def close(self):
+        """
+        Closes the corpus' SQLite connections (BM25 index and answer cache).
+        Its vectors live in the shared Chroma client, whose segment cache is an LRU
+        bounded by CHROMA_MEMORY_LIMIT_BYTES and evicts unused collections itself.
+        """
+        self.lexical.close()
+        self.answers.close()
+
+def read_manifest(key):
+    """Manifest of a completed corpus, or None if it was never (fully) built."""
+    path = os.path.join(corpus_dir(key), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[-] Ignoring unreadable corpus manifest {path}: {e}")
+        return None
+
+def _write_manifest(key, manifest):
+    directory = corpus_dir(key)
+    # Unique temp file: sessions attaching to the same corpus touch its manifest concurrently
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix=".tmp", delete=False) as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f.name, os.path.join(directory, MANIFEST_NAME))
+
+def touch_corpus(key):
+    """Records a use of the corpus; disk pruning removes the least recently used ones first."""
+    manifest = read_manifest(key)
+    if manifest is not None:
+        manifest["last_used"] = time.time()
+        try:
+            _write_manifest(key, manifest)
+        except OSError as e:
+            print(f"[-] Could not record use of corpus {key}: {e}")  # Only affects disk pruning order
+
+_build_locks = {}
+_build_locks_lock = threading.Lock()
+
+def build_lock(key):
+    """
+    Per-key lock held across "look up -> build -> register", so two sessions
+    uploading the same new file build it once instead of deleting each other's build.
+    """
+    with _build_locks_lock:
+        return _build_locks.setdefault(key, threading.Lock())
+
+def open_corpus(key, embeddings):
+    """
+    Attaches to a persisted corpus without re-embedding anything.
+    Returns a Corpus, or None when the corpus does not exist yet.
+    """
+    manifest = read_manifest(key)
+    if manifest is None:
+        return None
+    vectordb = Chroma(
+        client=get_client(),
+        collection_name=collection_name(key),
+        embedding_function=embeddings,
+        create_collection_if_not_exists=False,
+    )
+    lexical = LexicalIndex(os.path.join(corpus_dir(key), LEXICAL_INDEX_NAME))
+    answers = AnswerCache(os.path.join(corpus_dir(key), ANSWER_CACHE_NAME))
+    return Corpus(key, manifest, vectordb, lexical, answers)
+
+def delete_corpus(key):
+    """Drops a corpus' collection and its directory."""
+    try:
+        get_client().delete_collection(collection_name(key))
+    except Exception:
+        pass  # Never created, or already gone
+    shutil.rmtree(corpus_dir(key), ignore_errors=True)
+
+def create_corpus(key, docs, embeddings, info=None, on_progress=None):
+    """
+    Embeds docs into a new persistent collection; metadata lives in data/research_corpora/<key>.
+    Embedding runs through the batched, parallel ingestion pipeline, and the
+    BM25 index is filled batch by batch alongside the vector inserts.
+    The manifest is written last, so an interrupted build is never mistaken for a
+    finished one and is simply rebuilt on the next upload.
+    The caller must hold build_lock(key).
+    Returns a Corpus.
+    """
+    delete_corpus(key)  # Leftovers of an interrupted build (safe: no other build of this key is running)
+    os.makedirs(corpus_dir(key), exist_ok=True)
+
+    vectordb = Chroma(
+        client=get_client(),
+        collection_name=collection_name(key),
+        embedding_function=embeddings,
+    )
+    lexical = LexicalIndex(os.path.join(corpus_dir(key), LEXICAL_INDEX_NAME))
+    stats = embed_and_insert(vectordb, docs, embeddings, on_batch=lexical.add_documents, on_progress=on_progress)
+
+    manifest = dict(info or {})
+    manifest.update({
+        "key": key,
+        "num_chunks": stats["chunks"],
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "last_used": time.time(),
+        "build_seconds": stats["seconds"],
+        "chunks_per_sec": stats["chunks_per_sec"],
+    })
+    _write_manifest(key, manifest)
+    print(f"[+] Corpus {key} built: {stats['chunks']} chunks in {stats['seconds']}s.")
+    answers = AnswerCache(os.path.join(corpus_dir(key), ANSWER_CACHE_NAME))
+    return Corpus(key, manifest, vectordb, lexical, answers)
+
+def prune_stored_corpora(keep=(), max_chunks=MAX_STORED_CHUNKS):
+    """
+    Deletes least recently used corpora from disk until the stored chunk total
+    fits max_chunks. Keys in `keep` (corpora attached to live sessions) are never deleted.
+    """
+    if not os.path.isdir(CORPORA_DIR):
+        return []
+    stored = []
+    for key in os.listdir(CORPORA_DIR):
+        manifest = read_manifest(key)
+        if manifest is not None:
+            stored.append((manifest.get("last_used", 0), key, manifest["num_chunks"]))
+
+    total = sum(n for _, _, n in stored)
+    deleted = []
+    for _, key, num_chunks in sorted(stored):
+        if total <= max_chunks:
+            break
+        if key in keep:
+            continue
+        delete_corpus(key)
+        total -= num_chunks
+        deleted.append(key)
+    if deleted:
+        print(f"[*] Pruned {len(deleted)} stored corpora ({total} chunks remain on disk).")
+    return deleted
+
+# =====================================================================
+# SESSION LIFECYCLE
+# =====================================================================
+class CorpusRegistry:
+    """
+    Tracks which corpus each investigator session is using.
+    Sessions idle for longer than idle_ttl are detached. Corpora stay open
+    while the open chunk total fits max_open_chunks; past that, the least
+    recently used ones are closed, starting with corpora no session uses,
+    then those whose sessions have been idle for evict_idle seconds. A corpus
+    in active use is never closed. Sessions sharing one document share one handle.
+    """
+
+    def __init__(self, idle_ttl=SESSION_IDLE_TTL_SECONDS, max_open_chunks=MAX_OPEN_CHUNKS, evict_idle=EVICT_IDLE_SECONDS):
+        self.idle_ttl = idle_ttl
+        self.max_open_chunks = max_open_chunks
+        self.evict_idle = evict_idle
+        self.sessions = {}                # session_id -> (key, last_used)
+        self.open_corpora = OrderedDict()  # key -> Corpus, least recently used first
+        self.lock = threading.RLock()
+
+    def lookup(self, key):
+        """The open handle for a corpus key, or None."""
+        with self.lock:
+            return self.open_corpora.get(key)
+
+    def attach(self, session_id, corpus):
+        with self.lock:
+            held = self.open_corpora.get(corpus.key)
+            if held is not None and held is not corpus:
+                corpus.close()  # Another session already opened this corpus; share its handle
+                corpus = held
+            self.sessions[session_id] = (corpus.key, time.time())
+            self.open_corpora[corpus.key] = corpus
+            self.open_corpora.move_to_end(corpus.key)
+            self.sweep()
+            return corpus
+
+    def get(self, session_id):
+        """The session's Corpus, or None if it never loaded one or was evicted."""
+        with self.lock:
+            self.sweep()
+            entry = self.sessions.get(session_id)
+            if entry is None or entry[0] not in self.open_corpora:
+                return None
+            key = entry[0]
+            self.sessions[session_id] = (key, time.time())
+            self.open_corpora.move_to_end(key)
+            return self.open_corpora[key]
+
+    def detach(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+            self.sweep()
+
+    def _close(self, key):
+        corpus = self.open_corpora.pop(key)
+        for session_id in [s for s, (k, _) in self.sessions.items() if k == key]:
+            del self.sessions[session_id]
+        corpus.close()
+        return corpus.num_chunks
+
+    def sweep(self):
+        """Applies the idle TTL and the open-chunk cap."""
+        with self.lock:
+            now = time.time()
+            for session_id, (_, last_used) in list(self.sessions.items()):
+                if now - last_used > self.idle_ttl:
+                    del self.sessions[session_id]
+
+            total = sum(c.num_chunks for c in self.open_corpora.values())
+            if total <= self.max_open_chunks:
+                return
+
+            # Most recent use of each corpus by any session
+            last_used = {}
+            for key, used in self.sessions.values():
+                last_used[key] = max(used, last_used.get(key, 0))
+            detached = [key for key in self.open_corpora if key not in last_used]
+            idle = sorted(
+                (key for key in self.open_corpora if key in last_used and now - last_used[key] >= self.evict_idle),
+                key=lambda key: last_used[key],
+            )
+            for key in detached + idle:
+                if total <= self.max_open_chunks:
+                    break
+                total -= self._close(key)
+                print(f"[*] Closed corpus {key} to stay under {self.max_open_chunks} open chunks.")
+            if total > self.max_open_chunks:
+                print(f"[!] {total} chunks open, over the {self.max_open_chunks} cap: every open corpus is in active use.")
+
+    def active_keys(self):
+        """Keys of every corpus the registry holds open, attached or not; disk pruning must keep them."""
+        with self.lock:
+            return set(self.open_corpora) | {key for key, _ in self.sessions.values()}
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """Process-wide session registry, shared by every Streamlit session."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = CorpusRegistry()
+        return _registry
@@ -0,0 +1,158 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# =====================================================================
+# CONFIGURATION & PATHS
+# =====================================================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_PATH = os.path.join(BASE_DIR, "data", "embedding_cache.db")
+MAX_CACHE_BYTES = int(os.environ.get("EVOFORENSIC_EMBED_CACHE_BYTES", 1024 ** 3))
+EVICT_TO_RATIO = 0.9     # Evict down to 90% of the cap so eviction does not run on every insert
+SQL_BATCH = 500          # Keys per IN (...) lookup, below SQLite's variable limit
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_text(text):
+    """Chunk text as it is hashed: Unicode NFC with whitespace runs collapsed."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+def cache_key(model, text):
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Disk-backed, content-addressed embedding store shared by all corpora.
+    Vectors are keyed by (model, normalized text) hash and kept as float32 blobs.
+    When the stored bytes exceed max_bytes, the least recently used vectors are evicted.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                vector BLOB,
+                size INTEGER,
+                last_used REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys):
+        """{key: vector} for the keys present in the cache; refreshes their LRU position."""
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), SQL_BATCH):
+                part = keys[i:i + SQL_BATCH]
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self.conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self.conn.commit()
+        return found
+
+    def put_many(self, model, items):
+        """Stores (key, vector) pairs, then evicts if the cache is over its size cap."""
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, model, blob, len(blob), now))
+        with self.lock:
+            cursor = self.conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, size, last_used) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+            if cursor.rowcount == len(rows):
+                self.total_bytes += sum(r[3] for r in rows)
+            else:
+                # Another thread stored some of these first; recount instead of guessing
+                self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        target = int(self.max_bytes * EVICT_TO_RATIO)
+        removed = 0
+        cursor = self.conn.execute("SELECT key, size FROM embeddings ORDER BY last_used")
+        victims = []
+        for key, size in cursor:
+            if self.total_bytes - removed <= target:
+                break
+            victims.append((key,))
+            removed += size
+        self.conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self.conn.commit()
+        self.total_bytes -= removed
+        print(f"[*] Embedding cache evicted {len(victims)} vectors ({removed / 1024 ** 2:.1f} MB).")
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model so every call checks the shared cache first and
+    only embeds texts it has never seen (each distinct text once per call).
+    """
+
+    def __init__(self, inner, model, cache=None):
+        self.inner = inner
+        self.model = model
+        self._cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = get_embedding_cache()
+        return self._cache
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        keys = [cache_key(self.model, t) for t in texts]
+        found = self.cache.get_many(list(set(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.inner.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model, new_items)
+            found.update(new_items)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+_instance = None
+_instance_lock = threading.Lock()
+
+def get_embedding_cache():
+    """Process-wide embedding cache, opened lazily on first use."""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = EmbeddingCache(CACHE_PATH, MAX_CACHE_BYTES)
+        return _instance
@@ -0,0 +1,136 @@
+import os
+import time
+import queue
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+EMBED_BATCH_SIZE = int(os.environ.get("EVOFORENSIC_EMBED_BATCH", 32))     # Chunks per embedding request
+EMBED_CONCURRENCY = int(os.environ.get("EVOFORENSIC_EMBED_WORKERS", 4))   # Requests in flight to Ollama
+MAX_PENDING_PER_WORKER = 2  # Batches queued per worker beyond the one it is embedding
+PREFETCH_DOCS = 256         # Chunks the reader/chunker thread may run ahead of the embedders
+
+_DONE = object()
+
+def prefetch(items, maxsize=PREFETCH_DOCS):
+    """
+    Pulls items (e.g. chunks parsed from a file stream) on a background thread
+    into a bounded queue, so reading and chunking overlap with embedding while
+    never running more than maxsize items ahead.
+    Exceptions raised by the producer are re-raised in the consumer.
+    Closing the generator stops the producer and waits for it to exit, so the
+    caller may release the underlying stream as soon as close() returns.
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        """Queues an item unless the consumer has gone away; False once stopped."""
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    reader = threading.Thread(target=produce, name="ingest-reader", daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()  # Consumer finished or failed: let the producer exit
+        reader.join()
+
+def _batches(docs, batch_size):
+    docs = iter(docs)
+    while True:
+        batch = list(islice(docs, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def embed_and_insert(vectordb, docs, embeddings, batch_size=EMBED_BATCH_SIZE,
+                     max_workers=EMBED_CONCURRENCY, on_batch=None, on_progress=None):
+    """
+    Ingestion pipeline: chunks are embedded in batches by a thread pool while
+    finished batches are inserted into the Chroma collection on this thread,
+    so inserts overlap with the embedding requests still in flight.
+    docs may be any iterable of Documents with a metadata["chunk"] id, including
+    a lazy stream: it is consumed on a reader thread through a bounded queue and
+    only a bounded window of batches is pending at once, so memory stays flat.
+    on_batch(batch) is called after each insert, e.g. to feed the lexical index.
+    Returns stats: {"chunks", "batches", "seconds", "chunks_per_sec"}.
+    """
+    collection = vectordb._collection
+    max_pending = max_workers * MAX_PENDING_PER_WORKER
+    reader = prefetch(docs)
+    batch_iter = _batches(reader, batch_size)
+    start = time.perf_counter()
+    inserted = 0
+    batches = 0
+
+    def embed_batch(batch):
+        return batch, embeddings.embed_documents([d.page_content for d in batch])
+
+    # Closing the reader on any exit means it no longer touches the source stream once we return
+    with closing(reader), ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embed") as pool:
+        pending = set()
+        exhausted = False
+
+        while pending or not exhausted:
+            # Top up the in-flight window
+            while not exhausted and len(pending) < max_pending:
+                batch = next(batch_iter, None)
+                if batch is None:
+                    exhausted = True
+                    break
+                pending.add(pool.submit(embed_batch, batch))
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch, vectors = future.result()  # An embedding failure aborts the build
+                collection.add(
+                    ids=[str(d.metadata["chunk"]) for d in batch],
+                    embeddings=vectors,
+                    documents=[d.page_content for d in batch],
+                    metadatas=[d.metadata for d in batch],
+                )
+                if on_batch:
+                    on_batch(batch)
+                inserted += len(batch)
+                batches += 1
+                if on_progress:
+                    on_progress(inserted)
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "chunks": inserted,
+        "batches": batches,
+        "seconds": round(seconds, 2),
+        "chunks_per_sec": round(inserted / seconds, 1) if seconds > 0 else float(inserted),
+    }
+    print(f"[+] Embedded {inserted} chunks in {batches} batches: {stats['chunks_per_sec']} chunks/s.")
+    return stats
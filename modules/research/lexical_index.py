@@ -0,0 +1,169 @@
+import re
+import json
+import sqlite3
+import threading
+from langchain_core.documents import Document
+from modules.research.case_index import FIELDS, extract_case_fields
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+# Identifiers keep their inner punctuation: 185.92.61.22, cf-2025-001, a.b@corp.in, /srv/x.csv
+TOKEN_RE = re.compile(r"\w(?:[\w.\-@:/]*\w)?")
+PART_RE = re.compile(r"[^\W_]+")
+TOKEN_CHARS = ".-@:/_"
+STOPWORDS = frozenset("""
+a an and are as at be by did do does for from had has have how i in is it its me of on or
+tell that the their there this to was were what when where which who why will with about
+""".split())
+
+def analyze(text):
+    """
+    Terms indexed for a text: every token lowercased, plus the parts of compound
+    identifiers so 'CF-2025-001' matches both exactly and by '2025'.
+    """
+    terms = []
+    for token in TOKEN_RE.findall(text.lower()):
+        terms.append(token)
+        parts = PART_RE.findall(token)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+def is_identifier(token):
+    """Tokens such as IPs, case ids, device ids and paths: mixed digits and separators."""
+    return any(c.isdigit() for c in token) and any(c in TOKEN_CHARS for c in token)
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+class LexicalIndex:
+    """
+    Per-corpus BM25 inverted index on SQLite FTS5, stored next to the corpus manifest.
+    The chunk table also keeps each chunk's text and metadata, so lexical hits
+    are returned as Documents without touching the vector store, and a case
+    table maps every case number to its header fields (Case ID, Type, Company, Year).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk INTEGER PRIMARY KEY,
+                case_number TEXT,
+                text TEXT,
+                metadata TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_case ON chunks(case_number, chunk)")
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS cases (
+                case_number TEXT PRIMARY KEY,
+                {", ".join(f"{field} TEXT" for field in FIELDS)}
+            )
+        """)
+        self.conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                terms, content='', tokenize="unicode61 tokenchars '{TOKEN_CHARS}'"
+            )
+        """)
+        self.conn.commit()
+        self._case_table = None
+
+    def add_documents(self, docs):
+        """Indexes a batch of Documents keyed by metadata['chunk'], recording case header fields."""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk, case_number, text, metadata) VALUES (?, ?, ?, ?)",
+                [(d.metadata["chunk"], str(d.metadata.get("case_number", "")), d.page_content, json.dumps(d.metadata))
+                 for d in docs],
+            )
+            self.conn.executemany(
+                "INSERT INTO chunks_fts (rowid, terms) VALUES (?, ?)",
+                [(d.metadata["chunk"], " ".join(analyze(d.page_content))) for d in docs],
+            )
+            for d in docs:
+                case_number = str(d.metadata.get("case_number", ""))
+                fields = {f: d.metadata[f] for f in FIELDS if f in d.metadata} or extract_case_fields(d.page_content)
+                if not fields:
+                    continue
+                self.conn.execute("INSERT OR IGNORE INTO cases (case_number) VALUES (?)", (case_number,))
+                # First value seen for a field wins; later chunks of the case may quote other files
+                assignments = ", ".join(f"{field} = COALESCE({field}, ?)" for field in fields)
+                self.conn.execute(
+                    f"UPDATE cases SET {assignments} WHERE case_number = ?", (*fields.values(), case_number)
+                )
+            self.conn.commit()
+            self._case_table = None
+
+    def search(self, query, k=20, case_number=None):
+        """BM25-ranked [(chunk_id, score)], best first; score is higher-is-better."""
+        terms = [t for t in dict.fromkeys(analyze(query)) if t not in STOPWORDS]
+        return self._match(" OR ".join(_quote(t) for t in terms), k, case_number) if terms else []
+
+    def search_exact(self, identifiers, k=20, case_number=None):
+        """Chunks containing every one of the given identifier tokens, BM25-ranked."""
+        identifiers = [t.lower() for t in identifiers]
+        return self._match(" AND ".join(_quote(t) for t in identifiers), k, case_number) if identifiers else []
+
+    def _match(self, match, k, case_number):
+        sql = "SELECT chunks_fts.rowid, bm25(chunks_fts) FROM chunks_fts"
+        params = [match]
+        if case_number is not None:
+            sql += " JOIN chunks ON chunks.chunk = chunks_fts.rowid WHERE chunks_fts MATCH ? AND chunks.case_number = ?"
+            params.append(str(case_number))
+        else:
+            sql += " WHERE chunks_fts MATCH ?"
+        sql += " ORDER BY bm25(chunks_fts) LIMIT ?"
+        params.append(k)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        # FTS5's bm25() is negative, lower meaning more relevant
+        return [(chunk, -score) for chunk, score in rows]
+
+    def get_documents(self, chunk_ids):
+        """Documents for the given chunk ids, in the order given."""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return []
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT chunk, text, metadata FROM chunks WHERE chunk IN ({','.join('?' * len(chunk_ids))})",
+                chunk_ids,
+            ).fetchall()
+        by_id = {chunk: Document(page_content=text, metadata=json.loads(meta)) for chunk, text, meta in rows}
+        return [by_id[c] for c in chunk_ids if c in by_id]
+
+    # -----------------------------------------------------------------
+    # Structured case lookups (no embedding involved)
+    # -----------------------------------------------------------------
+    def case_chunks(self, case_number):
+        """All chunk ids of a case, in document order."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT chunk FROM chunks WHERE case_number = ? ORDER BY chunk", (str(case_number),)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def case_table(self):
+        """Header fields of every case as a list of dicts (small; cached in memory)."""
+        with self.lock:
+            if self._case_table is None:
+                cursor = self.conn.execute("SELECT * FROM cases ORDER BY CAST(case_number AS INTEGER)")
+                columns = [c[0] for c in cursor.description]
+                self._case_table = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return self._case_table
+
+    def find_cases(self, **fields):
+        """Case numbers whose header fields equal the given values (case-insensitive), e.g. find_cases(year="2024")."""
+        wanted = {f: str(v).strip().lower() for f, v in fields.items() if f in FIELDS}
+        return [
+            row["case_number"] for row in self.case_table()
+            if all((row.get(f) or "").lower() == v for f, v in wanted.items())
+        ]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,50 @@
+from modules.research.lexical_index import TOKEN_RE, STOPWORDS, is_identifier
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+RRF_K = 60             # Standard reciprocal-rank-fusion damping constant
+CANDIDATES_PER_RETRIEVER = 20
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Fuses several best-first lists of ids: score(id) = sum(1 / (k + rank)).
+    Returns ids ordered by fused score.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: scores[item], reverse=True)
+
+def query_identifiers(query):
+    """Identifier tokens in a query, e.g. ['185.92.61.22'] for 'who used 185.92.61.22?'."""
+    return [t for t in dict.fromkeys(TOKEN_RE.findall(query.lower())) if is_identifier(t)]
+
+def is_identifier_query(query):
+    """True when every meaningful token is an identifier, e.g. '185.92.61.22' or 'CF-2025-001 0781-PNY-2982'."""
+    tokens = [t for t in TOKEN_RE.findall(query.lower()) if t not in STOPWORDS]
+    return bool(tokens) and all(is_identifier(t) for t in tokens)
+
+def hybrid_search(corpus, query, k=7, case_number=None, candidates=CANDIDATES_PER_RETRIEVER):
+    """
+    BM25 and dense retrieval over a corpus, fused with reciprocal-rank fusion.
+    Chunks containing every identifier named in the query are ranked first, and
+    pure identifier lookups they answer skip the query embedding altogether.
+    Returns Documents, best first.
+    """
+    exact = []
+    identifiers = query_identifiers(query)
+    if identifiers:
+        exact = [chunk for chunk, _ in corpus.lexical.search_exact(identifiers, k=k, case_number=case_number)]
+        if exact and is_identifier_query(query):
+            return corpus.lexical.get_documents(exact)
+
+    lexical = [chunk for chunk, _ in corpus.lexical.search(query, k=candidates, case_number=case_number)]
+    search_kwargs = {"k": candidates}
+    if case_number is not None:
+        search_kwargs["filter"] = {"case_number": case_number}
+    dense = [d.metadata["chunk"] for d in corpus.vectordb.similarity_search(query, **search_kwargs)]
+
+    fused = exact + [chunk for chunk in reciprocal_rank_fusion([lexical, dense]) if chunk not in exact]
+    return corpus.lexical.get_documents(fused[:k])
@@ -0,0 +1,28 @@
+from modules.research.answer_cache import AnswerCache, conversation_key, query_signature
+from modules.research.context_packer import pack_history
+
+MODEL = "llama3.2"
+CITATIONS = [{"case_number": "14", "case_id": "CF-2023-005", "chunks": [40]}]
+
+def _signature(query, target_cases, history):
+    history_text = pack_history(history)
+    return query_signature(query, target_cases, conversation_key(query, target_cases, history_text))
+
+def test_second_turn_question_naming_its_case_hits_cache(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.db"))
+    cache.store(MODEL, "summarize case 14", _signature("summarize case 14", ["14"], []), "Guilty.", CITATIONS)
+
+    history = [("user", "summarize case 3"), ("assistant", "Case 3 was a network breach.")]
+    hit = cache.lookup_exact(MODEL, "Summarize case 14?", _signature("Summarize case 14?", ["14"], history))
+    assert hit is not None and hit["answer"] == "Guilty."
+    cache.close()
+
+def test_elliptical_follow_up_only_matches_its_own_conversation(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.db"))
+    first = [("user", "summarize case 14"), ("assistant", "Guilty.")]
+    other = [("user", "summarize case 3"), ("assistant", "Acquitted.")]
+    cache.store(MODEL, "And the sentence?", _signature("And the sentence?", [], first), "Four years.", CITATIONS)
+
+    assert cache.lookup_exact(MODEL, "And the sentence?", _signature("And the sentence?", [], other)) is None
+    assert cache.lookup_exact(MODEL, "And the sentence?", _signature("And the sentence?", [], first)) is not None
+    cache.close()
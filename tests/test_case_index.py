@@ -0,0 +1,16 @@
+from modules.research.case_index import route_query
+
+class _NoCases:
+    """Stands in for the lexical index; case-number routing never consults it."""
+    def find_cases(self, **fields):
+        return []
+    def case_table(self):
+        return []
+
+def test_every_named_case_number_is_routed():
+    assert route_query("compare case 3 and case 5", _NoCases()) == ["3", "5"]
+    assert route_query("compare cases 3, 5 and 3", _NoCases()) == ["3", "5"]
+
+def test_single_case_number():
+    assert route_query("Tell me about case file #14", _NoCases()) == ["14"]
+    assert route_query("which cases involved ransomware?", _NoCases()) == []
@@ -0,0 +1,14 @@
+from modules.forensic.entity_extractor import extract_entities
+
+def _phones(text):
+    return [(n["id"], n["label"]) for n in extract_entities(text, {"suspect_id": "S-1"}) if n["type"] == "Phone"]
+
+def test_sentence_final_phone_number():
+    assert _phones("He called +91 98765 43210.") == [("919876543210", "+91 98765 43210")]
+    assert _phones("Phone: 0781-555-2982.") == [("07815552982", "0781-555-2982")]
+
+def test_parenthesised_phone_number():
+    assert _phones("Reach the handler on (0781) 555 2982 after dark.") == [("07815552982", "(0781) 555 2982")]
+
+def test_dates_and_ips_are_not_phones():
+    assert _phones("Seen on 2024-12-10 at 185.92.61.22. Build 10.12.2024.") == []
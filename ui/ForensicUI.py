@@ -14,7 +14,13 @@ if parent_dir not in sys.path:
 
 try:
     from modules.forensic.forensic_engine import process_suspect_image
-    from modules.forensic.report_generator import generate_suspect_pdf
+    from modules.forensic.report_generator import render_suspect_pdf
+    from modules.forensic.graph_builder import render_graph_html
+    from modules.forensic.graph_summary import summarize_graph
+    from modules.forensic.graph_store import serialize_graph, export_graphml, get_delta
+    from modules.forensic.bulk_export import export_suspects_zip, new_export_archive
+    from modules.forensic.rag_engine import list_suspect_ids
+    from modules.forensic.knowledge_graph import get_knowledge_graph
 except ImportError as e:
     st.error(f"⚠️ Logic Module Missing. Ensure 'modules/forensic/forensic_engine.py' and 'report_generator.py' exist. Error: {e}")
     st.stop()
@@ -207,7 +213,45 @@ def inject_biometric_theme():
     """, unsafe_allow_html=True)
 
 # ---------------------------------------------------------
-# 3. MAIN UI RENDER
+# 3. LEVEL-OF-DETAIL GRAPH EXPLORER
+# ---------------------------------------------------------
+@st.fragment
+def render_cluster_explorer(graph_data, clusters):
+    """
+    Summarized view for large networks. Runs as a fragment so expanding a
+    cluster only re-renders this panel, not the whole scan.
+    """
+    st.caption(f"Large network: {len(graph_data['nodes'])} entities grouped into {len(clusters)} communities. Expand clusters to drill down.")
+    cluster_labels = {c["id"]: f"{c['label']} ({c['member_count']} entities)" for c in clusters}
+    expanded = st.multiselect(
+        "Expand clusters",
+        options=list(cluster_labels),
+        format_func=cluster_labels.get
+    )
+    display_graph, _ = summarize_graph(graph_data, expanded=expanded)
+    components.html(render_graph_html(display_graph), height=620)
+
+def render_graph_delta(delta):
+    """Summarizes what a re-extraction changed compared with the version this session saw last."""
+    st.info(
+        f"🔁 Network updated since your last scan (v{delta['from_version'][:8]} → v{delta['to_version'][:8]}): "
+        f"+{len(delta['added_nodes'])} / -{len(delta['removed_nodes'])} entities, "
+        f"+{len(delta['added_edges'])} / -{len(delta['removed_edges'])} relationships"
+    )
+    with st.expander("View changes"):
+        for node in delta["added_nodes"]:
+            st.markdown(f"➕ `{node['label']}` ({node['type']})")
+        for node_id in delta["removed_nodes"]:
+            st.markdown(f"➖ `{node_id}`")
+        for node in delta["changed_nodes"]:
+            st.markdown(f"✏️ `{node['label']}` ({node['type']})")
+        for edge in delta["added_edges"]:
+            st.markdown(f"➕ `{edge['source']}` —*{edge['label'] or 'linked'}*→ `{edge['target']}`")
+        for edge in delta["removed_edges"]:
+            st.markdown(f"➖ `{edge['source']}` —*{edge['label'] or 'linked'}*→ `{edge['target']}`")
+
+# ---------------------------------------------------------
+# 4. MAIN UI RENDER
 # ---------------------------------------------------------
 def show_forensic_ui():
     inject_biometric_theme()
@@ -222,6 +266,9 @@ def show_forensic_ui():
 
     st.markdown("---")
 
+    show_bulk_export()
+    show_network_queries()
+
     # Upload Section
     st.markdown("### 📸 [STEP 1] Input Suspect Media")
     uploaded_file = st.file_uploader("Upload CCTV Frame or Suspect Photograph", type=["jpg", "jpeg", "png"], label_visibility="collapsed")
@@ -236,6 +283,16 @@ def show_forensic_ui():
         with open(temp_img_path, "wb") as f:
             f.write(uploaded_file.getbuffer())
 
+        # Extraction Mode Toggle
+        instant_graph = st.toggle(
+            "⚡ Instant Graph (rule-based extraction, skip LLM relationship inference)",
+            value=False
+        )
+        refresh_graph = st.toggle(
+            "🔄 Re-extract network (ignore cached knowledge graph for this suspect)",
+            value=False
+        )
+
         # Scan Button
         if st.button("🔍 INITIATE BIOMETRIC SCAN", use_container_width=True, type="primary"):
             
@@ -265,8 +322,24 @@ def show_forensic_ui():
                 terminal_placeholder.markdown(custom_terminal, unsafe_allow_html=True)
                 time.sleep(0.4) 
                 
+            # Live topology preview: grows as nodes and edges stream out of the extractor
+            live_graph_placeholder = st.empty()
+
+            def render_live_graph(partial_graph):
+                live_html = render_graph_html(partial_graph)
+                if live_html:
+                    with live_graph_placeholder.container():
+                        st.caption(f"📡 Live extraction: {len(partial_graph['nodes'])} nodes, {len(partial_graph['edges'])} edges...")
+                        components.html(live_html, height=620)
+
             # Actually call the heavy AI logic while they watch the terminal
-            results = process_suspect_image(temp_img_path)
+            results = process_suspect_image(
+                temp_img_path,
+                use_llm=not instant_graph,
+                on_graph_update=render_live_graph,
+                refresh_graph=refresh_graph
+            )
+            live_graph_placeholder.empty()
             
             # Add the final success message to the terminal so it stays on screen
             terminal_text += "<br>[SYSTEM] ✓ Process finished. Evidence loaded below."
@@ -323,11 +396,9 @@ def show_forensic_ui():
                     # ✨ PDF REPORT GENERATION FEATURE ✨
                     with st.spinner("Compiling Official Report..."):
                         try:
-                            pdf_path = generate_suspect_pdf(meta, results["score"], temp_img_path)
+                            # Rendered in memory and cached, so reruns don't rebuild the PDF
+                            pdf_bytes = render_suspect_pdf(meta, results["score"], temp_img_path)
                             
-                            with open(pdf_path, "rb") as pdf_file:
-                                pdf_bytes = pdf_file.read()
-                                
                             st.download_button(
                                 label="📄 DOWNLOAD OFFICIAL DOSSIER",
                                 data=pdf_bytes,
@@ -344,15 +415,14 @@ def show_forensic_ui():
                     st.markdown('<div class="glass-panel">', unsafe_allow_html=True)
                     st.markdown("### 🕸️ Extracted Criminal Network Topology")
                     
-                    if results["graph_html_path"] and os.path.exists(results["graph_html_path"]):
+                    if results.get("graph_html"):
                         st.caption("Powered by Llama 3.2 & PyVis. Interact with the nodes to explore the network.")
                         
-                        # Read the HTML file generated by PyVis
-                        with open(results["graph_html_path"], 'r', encoding='utf-8') as f:
-                            html_data = f.read()
-                        
-                        # Render HTML inside Streamlit
-                        components.html(html_data, height=620)
+                        if results.get("clusters"):
+                            render_cluster_explorer(results["graph_data"], results["clusters"])
+                        else:
+                            # Render the in-memory HTML inside Streamlit (no disk round trip)
+                            components.html(results["graph_html"], height=620)
 
                         # ✨ THE RAW INTELLIGENCE TABLE (ACADEMIC PROOF) ✨
                         with st.expander("🔬 [+] VIEW RAW AI EXTRACTION DATA (NER Triplets)"):
@@ -382,7 +452,126 @@ def show_forensic_ui():
                     else:
                         st.warning("⚠️ " + results.get("message", "Graph generation failed."))
                     
+                    if results.get("graph_data") and results["graph_data"].get("nodes"):
+                        export_name = results["match_id"].lower()
+                        col_json, col_graphml = st.columns(2)
+                        with col_json:
+                            _, graph_blob = serialize_graph(results["graph_data"])
+                            st.download_button(
+                                label="🗜️ EXPORT GRAPH (JSON.GZ)",
+                                data=graph_blob,
+                                file_name=f"{export_name}_graph_{results.get('graph_version') or 'latest'}.json.gz",
+                                mime="application/gzip",
+                                use_container_width=True
+                            )
+                        with col_graphml:
+                            st.download_button(
+                                label="🕸️ EXPORT GRAPH (GRAPHML)",
+                                data=export_graphml(results["graph_data"]),
+                                file_name=f"{export_name}_graph.graphml",
+                                mime="application/xml",
+                                use_container_width=True
+                            )
+                    
+                    # Only the changes are shown when this session already saw an older version
+                    seen_versions = st.session_state.setdefault("graph_versions", {})
+                    if results.get("graph_version"):
+                        previous_version = seen_versions.get(results["match_id"])
+                        if previous_version and previous_version != results["graph_version"]:
+                            delta = get_delta(results["match_id"], previous_version)
+                            if delta:
+                                render_graph_delta(delta)
+                        seen_versions[results["match_id"]] = results["graph_version"]
+                    
+                    if results.get("linked_suspects"):
+                        st.markdown(f"**🔗 Shares entities with:** `{', '.join(s.upper() for s in results['linked_suspects'])}`")
+                    
                     st.markdown('</div>', unsafe_allow_html=True)
 
+# ---------------------------------------------------------
+# 5. BULK DOSSIER EXPORT
+# ---------------------------------------------------------
+def show_bulk_export():
+    with st.expander("📦 Bulk Dossier Export (Prosecution Package)"):
+        suspect_ids = list_suspect_ids()
+        if not suspect_ids:
+            st.info("No case records available for export.")
+            return
+        
+        selected = st.multiselect("Suspects to export", options=suspect_ids, format_func=str.upper)
+        if selected and st.button("📦 BUILD ZIP ARCHIVE", use_container_width=True):
+            progress = st.progress(0.0)
+            
+            # Rendered in a process pool and streamed to disk; only this session's
+            # download button ever serves it, and the file is removed once handed over
+            archive_path = new_export_archive()
+            try:
+                with open(archive_path, "wb") as archive:
+                    count = export_suspects_zip(
+                        selected,
+                        archive,
+                        on_progress=lambda done: progress.progress(min(done / len(selected), 1.0))
+                    )
+                with open(archive_path, "rb") as archive:
+                    st.download_button(
+                        label=f"⬇️ DOWNLOAD {count} DOSSIERS (ZIP)",
+                        data=archive,
+                        file_name="EvoForensic_Dossiers.zip",
+                        mime="application/zip",
+                        use_container_width=True
+                    )
+            finally:
+                os.remove(archive_path)
+
+# ---------------------------------------------------------
+# 6. NETWORK QUERIES (GLOBAL KNOWLEDGE GRAPH)
+# ---------------------------------------------------------
+def show_network_queries():
+    with st.expander("🧭 Network Queries (all scanned suspects)"):
+        index = get_knowledge_graph().query_index()
+        if not index.nodes:
+            st.info("The knowledge graph is empty. Scan a suspect to start building it.")
+            return
+        
+        def label(node_id):
+            return index.nodes[node_id].get("label", node_id)
+        
+        st.caption(f"{len(index.nodes)} entities · {len(index.edge_labels)} relationships (graph v{index.version})")
+        col_from, col_to = st.columns(2)
+        with col_from:
+            source = st.text_input("Entity", placeholder="Suspect name, IP, email, organization...")
+        with col_to:
+            target = st.text_input("Connected to (optional)", placeholder="e.g. 185.92.61.22")
+        
+        if source and target:
+            hops = index.path_with_labels(source, target)
+            if hops:
+                st.markdown("**Shortest connection:**")
+                for u, relation, v in hops:
+                    st.markdown(f"`{label(u)}` —*{relation or 'linked'}*→ `{label(v)}`")
+            else:
+                st.warning("No connection found between these entities.")
+        elif source:
+            shared = index.shares_infrastructure_with(source)
+            if shared:
+                st.markdown("**Shares infrastructure with:**")
+                for person, via in sorted(shared.items(), key=lambda item: label(item[0])):
+                    st.markdown(f"`{label(person)}` via {', '.join(f'`{label(v)}`' for v in sorted(via))}")
+            elif index.resolve(source) is None:
+                st.warning("Entity not found in the knowledge graph.")
+            else:
+                st.info("No other suspect shares infrastructure with this entity.")
+        
+        st.markdown("**Most connected entities:**")
+        top = index.degree_centrality(top_n=10)
+        st.dataframe(
+            {
+                "Entity": [label(n) for n, _ in top],
+                "Type": [index.nodes[n].get("type", "Unknown") for n, _ in top],
+                "Degree Centrality": [round(c, 3) for _, c in top],
+            },
+            use_container_width=True
+        )
+
 if __name__ == "__main__":
     show_forensic_ui()
\ No newline at end of file
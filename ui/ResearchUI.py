@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 import sys
+import uuid
 
 # Ensure modules can be imported
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -128,6 +129,11 @@ def show_research_ui():
 
     st.markdown("---")
 
+    # Each browser session gets its own corpus slot in the shared registry
+    if "research_session_id" not in st.session_state:
+        st.session_state["research_session_id"] = uuid.uuid4().hex
+    session_id = st.session_state["research_session_id"]
+
     col_upload, col_chat = st.columns([1.2, 2])
 
     # --- LEFT PANEL: UPLOAD & VECTORIZE ---
@@ -144,17 +150,24 @@ def show_research_ui():
             if st.button("⚡ PROCESS EVIDENCE", use_container_width=True):
                 with st.spinner("Extracting Metadata & Building Vector DB..."):
                     try:
-                        # 1. Read the text from the uploaded file
-                        text_content = uploaded_file.getvalue().decode("utf-8")
+                        # 1. Stream the uploaded file straight into the ingestion pipeline
+                        # (never decoded into one string, so large evidence dumps stay cheap)
+                        progress_text = st.empty()
+                        def on_progress(chunks_done):
+                            progress_text.caption(f"Embedded {chunks_done} chunks...")
                         
-                        # 2. Pass string to YOUR custom logic
-                        num_docs, vectordb = ResearchMode.build_vectordb(text_content)
+                        # 2. Pass the file to YOUR custom logic (registers the corpus for this session)
+                        num_docs, corpus = ResearchMode.build_vectordb(
+                            uploaded_file, session_id=session_id, on_progress=on_progress
+                        )
+                        progress_text.empty()
                         
-                        # 3. Store the DB in Session State so it persists for the chat
+                        # 3. Only a flag is kept in Session State; the registry owns the index
                         st.session_state["doc_loaded"] = True
-                        st.session_state["vectordb"] = vectordb
                         
-                        st.success(f"Data successfully embedded ({num_docs} chunks). System ready for queries.")
+                        rate = corpus.manifest.get("chunks_per_sec")
+                        speed = f", {rate} chunks/s" if rate else ""
+                        st.success(f"Data successfully embedded ({num_docs} chunks{speed}). System ready for queries.")
                     except Exception as e:
                         st.error(f"Error processing document: {e}")
                         
@@ -183,8 +196,13 @@ def show_research_ui():
 
             # Generate AI Response
             with st.chat_message("assistant", avatar="🤖"):
-                if not st.session_state.get("doc_loaded", False) or "vectordb" not in st.session_state:
-                    response = "⚠️ **Access Denied.** No evidence loaded. Please ingest a document into the database first."
+                corpus = ResearchMode.get_session_corpus(session_id) if st.session_state.get("doc_loaded", False) else None
+                if corpus is None:
+                    if st.session_state.get("doc_loaded", False):
+                        response = "⚠️ **Session Expired.** The evidence index was released after inactivity. Please process the file again."
+                        st.session_state["doc_loaded"] = False
+                    else:
+                        response = "⚠️ **Access Denied.** No evidence loaded. Please ingest a document into the database first."
                     st.markdown(f"<span style='color: #F87171;'>{response}</span>", unsafe_allow_html=True)
                     st.session_state.messages.append({"role": "assistant", "content": response})
                 else:
@@ -192,14 +210,18 @@ def show_research_ui():
                     # Extract list of tuples: [("user", "hi"), ("assistant", "hello")]
                     history_tuples = [(m["role"], m["content"]) for m in st.session_state.messages[:-1]]
                     
-                    # Fetch the database from session state
-                    db_instance = st.session_state["vectordb"]
-                    
-                    # Call YOUR generator function
-                    response_stream = ResearchMode.rag_answer(prompt, history_tuples, db_instance)
+                    # Call YOUR generator function (fills query_stats with the prompt size)
+                    query_stats = {}
+                    response_stream = ResearchMode.rag_answer(prompt, history_tuples, corpus, stats=query_stats)
                     
                     # Streamlit's write_stream handles Python generators beautifully
                     full_response = st.write_stream(response_stream)
+                    if query_stats.get("answer_cache") in ("exact", "similar"):
+                        st.caption(f"Answered from cache · matched \"{query_stats['cached_query']}\" "
+                                   f"({query_stats['similarity']:.0%} similar)")
+                    elif query_stats:
+                        tokens = query_stats.get("prompt_tokens") or f"~{query_stats['prompt_tokens_est']}"
+                        st.caption(f"Prompt: {tokens} tokens · {query_stats['passages']} evidence passages")
                     
                     # Save final output to history
                     st.session_state.messages.append({"role": "assistant", "content": full_response})